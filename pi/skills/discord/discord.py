@@ -32,6 +32,17 @@ BOT_TOKEN = _load_env_var("DISCORD_BOT_TOKEN")
 GUILD_ID = _load_env_var("DISCORD_GUILD_ID")
 DEFAULT_CHANNEL = _load_env_var("DISCORD_DEFAULT_CHANNEL")
 
+# Static request headers, built once since BOT_TOKEN is fixed at import time.
+_HEADERS_BASE = {
+    "Authorization": f"Bot {BOT_TOKEN}",
+    "User-Agent": "DiscordSkill/1.0",
+} if BOT_TOKEN else None
+_HEADERS_JSON = {
+    **_HEADERS_BASE,
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+} if BOT_TOKEN else None
+
 
 # ─── Snowflake Helpers ──────────────────────────────────────────────────────
 
@@ -63,25 +74,19 @@ def api_call(method, endpoint, data=None, max_retries=3):
     Retries on 5xx errors with exponential backoff.
     Returns parsed JSON response. Raises DiscordError on failure.
     """
-    if not BOT_TOKEN:
+    if _HEADERS_JSON is None:
         raise DiscordError(
             "DISCORD_BOT_TOKEN not set. Set it in the environment."
         )
 
     url = f"{DISCORD_API}{endpoint}"
-    headers = {
-        "Authorization": f"Bot {BOT_TOKEN}",
-        "User-Agent": "DiscordSkill/1.0",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
 
     body = json.dumps(data).encode() if data else None
 
     for attempt in range(max_retries):
         try:
             req = urllib.request.Request(
-                url, data=body, headers=headers, method=method
+                url, data=body, headers=_HEADERS_JSON, method=method
             )
             with urllib.request.urlopen(req, timeout=30) as resp:
                 raw = resp.read()
@@ -265,21 +270,39 @@ def cmd_send(args):
 def cmd_read(args):
     """Read recent messages from a Discord channel."""
     channel_id = resolve_channel(args.channel)
-    limit = min(args.limit, 100)
 
-    params = {"limit": str(limit)}
+    cutoff = None
     if args.since:
         from datetime import datetime, timezone, timedelta
         cutoff_ms = (
             datetime.now(timezone.utc) - timedelta(minutes=args.since)
         ).timestamp() * 1000
-        params["after"] = snowflake_from_timestamp(cutoff_ms)
+        cutoff = int(snowflake_from_timestamp(cutoff_ms))
+
+    # Page backwards from the newest message with a before= cursor, since
+    # Discord caps each request at 100. Keyed by ID to drop page overlaps.
+    by_id = {}
+    before = None
+    while len(by_id) < args.limit:
+        page_size = min(args.limit - len(by_id), 100)
+        params = {"limit": str(page_size)}
+        if before:
+            params["before"] = before
+        query = urllib.parse.urlencode(params)
+        page = api_call("GET", f"/channels/{channel_id}/messages?{query}")
+        if not isinstance(page, list) or not page:
+            break
+
+        for m in page:
+            if cutoff is not None and int(m.get("id", 0)) <= cutoff:
+                continue
+            by_id.setdefault(m["id"], m)
+
+        before = page[-1]["id"]
+        if len(page) < page_size or (cutoff is not None and int(before) <= cutoff):
+            break
 
-    # Build URL with query params
-    query = urllib.parse.urlencode(params)
-    messages = api_call("GET", f"/channels/{channel_id}/messages?{query}")
-    if not isinstance(messages, list):
-        messages = []
+    messages = list(by_id.values())[:args.limit]
 
     # Filter by username
     if args.from_user:
@@ -404,7 +427,7 @@ def cmd_guilds(args):
 
 def _multipart_upload(channel_id, file_path, caption=None):
     """Upload a file to a Discord channel via multipart/form-data."""
-    if not BOT_TOKEN:
+    if _HEADERS_BASE is None:
         raise DiscordError(
             "DISCORD_BOT_TOKEN not set. Set it in the environment."
         )
@@ -436,8 +459,7 @@ def _multipart_upload(channel_id, file_path, caption=None):
 
     url = f"{DISCORD_API}/channels/{channel_id}/messages"
     headers = {
-        "Authorization": f"Bot {BOT_TOKEN}",
-        "User-Agent": "DiscordSkill/1.0",
+        **_HEADERS_BASE,
         "Content-Type": f"multipart/form-data; boundary={boundary}",
     }
 
@@ -501,15 +523,25 @@ def cmd_poll(args):
 
 
 def cmd_react(args):
-    """Add a reaction to a message."""
+    """Add a reaction to one or more messages."""
+    message_ids = []
+    if args.message_id:
+        message_ids.append(args.message_id)
+    if args.message_ids:
+        message_ids.extend(m.strip() for m in args.message_ids.split(",") if m.strip())
+    if not message_ids:
+        print("Error: give a message ID or --message-ids.", file=sys.stderr)
+        sys.exit(1)
+
     channel_id = resolve_channel(args.channel)
     encoded_emoji = urllib.parse.quote(args.emoji)
 
-    api_call(
-        "PUT",
-        f"/channels/{channel_id}/messages/{args.message_id}/reactions/{encoded_emoji}/@me",
-    )
-    print(f"Reacted with {args.emoji} on message {args.message_id}")
+    for message_id in message_ids:
+        api_call(
+            "PUT",
+            f"/channels/{channel_id}/messages/{message_id}/reactions/{encoded_emoji}/@me",
+        )
+        print(f"Reacted with {args.emoji} on message {message_id}")
 
 
 # ─── CLI ────────────────────────────────────────────────────────────────────
@@ -540,7 +572,7 @@ def main():
     )
     p_read.add_argument(
         "--limit", type=int, default=50,
-        help="Max messages to fetch (default: 50, max: 100)"
+        help="Max messages to fetch (default: 50, pages past 100)"
     )
     p_read.add_argument(
         "--from", dest="from_user", default=None,
@@ -606,9 +638,13 @@ def main():
     # react
     p_react = subparsers.add_parser("react", help="Add a reaction to a message")
     p_react.add_argument(
-        "message_id",
+        "message_id", nargs="?", default=None,
         help="ID of the message to react to"
     )
+    p_react.add_argument(
+        "--message-ids", default=None,
+        help="Comma-separated message IDs to react to in one run"
+    )
     p_react.add_argument(
         "--emoji", required=True,
         help="Emoji to react with (e.g. a unicode emoji or name:id for custom)"
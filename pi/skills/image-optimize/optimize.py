@@ -6,17 +6,36 @@ Resize, compress, and format images for platform-specific requirements.
 """
 
 import argparse
+import fnmatch
+import functools
+import io
 import json
 import os
+import re
+import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageOps
 except ImportError:
     print("Error: Pillow not installed. Run: pip install Pillow")
     sys.exit(1)
 
+try:
+    import numpy as np
+except ImportError:
+    print("Error: NumPy not installed. Run: pip install numpy")
+    sys.exit(1)
+
+# Optional libvips backend (--backend vips)
+try:
+    import pyvips
+    pyvips.cache_set_max(0)  # one-shot pipelines gain nothing from the op cache
+except ImportError:
+    pyvips = None
+
 
 # Platform specifications
 PLATFORM_SPECS = {
@@ -70,6 +89,10 @@ PLATFORM_SPECS = {
     }
 }
 
+# Worker threads for batch commands. Pillow releases the GIL while decoding,
+# resampling, and encoding, so threads scale with cores.
+BATCH_WORKERS = min(32, os.cpu_count() or 1)
+
 
 def format_size(size_bytes: int) -> str:
     """Format bytes as human-readable size."""
@@ -80,19 +103,23 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f} TB"
 
 
-def get_image_info(path: Path) -> dict:
-    """Get image information."""
-    with Image.open(path) as img:
-        stat = path.stat()
-        return {
-            "path": str(path),
-            "width": img.width,
-            "height": img.height,
-            "format": img.format,
-            "mode": img.mode,
-            "file_size": stat.st_size,
-            "file_size_human": format_size(stat.st_size)
-        }
+def get_image_info(path: Path, img: Image.Image = None) -> dict:
+    """Get image information, reusing an already-open image if given."""
+    if img is None:
+        with Image.open(path) as img:
+            return get_image_info(path, img)
+
+    # Stat the open handle rather than resolving the path again
+    file_size = os.fstat(img.fp.fileno()).st_size if img.fp else path.stat().st_size
+    return {
+        "path": str(path),
+        "width": img.width,
+        "height": img.height,
+        "format": img.format,
+        "mode": img.mode,
+        "file_size": file_size,
+        "file_size_human": format_size(file_size)
+    }
 
 
 def check_platform_compatibility(info: dict, platform: str) -> dict:
@@ -101,20 +128,21 @@ def check_platform_compatibility(info: dict, platform: str) -> dict:
     if not spec:
         return {"compatible": False, "reason": "unknown platform"}
 
+    max_w, max_h, max_size = spec["max_width"], spec["max_height"], spec["max_size"]
     result = {"compatible": True, "action": None, "reasons": []}
 
     # Check dimensions
-    if info["width"] > spec["max_width"] or info["height"] > spec["max_height"]:
+    if info["width"] > max_w or info["height"] > max_h:
         result["compatible"] = False
         result["action"] = "resize"
-        result["reasons"].append(f"exceeds {spec['max_width']}x{spec['max_height']}")
+        result["reasons"].append(f"exceeds {max_w}x{max_h}")
 
     # Check file size
-    if info["file_size"] > spec["max_size"]:
+    if info["file_size"] > max_size:
         result["compatible"] = False
         if result["action"] != "resize":
             result["action"] = "compress"
-        result["reasons"].append(f"exceeds {format_size(spec['max_size'])}")
+        result["reasons"].append(f"exceeds {format_size(max_size)}")
 
     # Check format
     if info["format"] and info["format"].upper() not in spec["formats"]:
@@ -130,6 +158,11 @@ def check_platform_compatibility(info: dict, platform: str) -> dict:
     return result
 
 
+# Modes Image.reduce() can box-average; palette, bilevel and I;16 images
+# raise "image has wrong mode" and go straight to resize()
+REDUCE_MODES = {"L", "LA", "RGB", "RGBA", "RGBX", "CMYK", "YCbCr", "I", "F"}
+
+
 def resize_image(img: Image.Image, max_width: int, max_height: int) -> Image.Image:
     """Resize image to fit within max dimensions while maintaining aspect ratio."""
     if img.width <= max_width and img.height <= max_height:
@@ -139,45 +172,185 @@ def resize_image(img: Image.Image, max_width: int, max_height: int) -> Image.Ima
     new_width = int(img.width * ratio)
     new_height = int(img.height * ratio)
 
+    # Box-reduce by an integer factor first, keeping 2x headroom so the final
+    # LANCZOS pass still sets the quality.
+    factor = min(img.width // new_width, img.height // new_height) // 2
+    if factor >= 2 and img.mode in REDUCE_MODES:
+        img = img.reduce(factor)
+
     return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
 
-def save_image(img: Image.Image, output_path: Path, format: str, quality: int) -> int:
-    """Save image and return file size."""
+def _to_rgb(img: Image.Image, bg: tuple = (255, 255, 255)) -> Image.Image:
+    """Flatten alpha onto a solid background for formats without alpha (JPEG).
+
+    Images already in a JPEG-compatible mode are returned untouched, so
+    flattening an already-flattened image costs nothing.
+    """
+    if img.mode in ("RGB", "L", "CMYK"):
+        return img
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    out = Image.new("RGB", img.size, bg)
+    out.paste(img, mask=img.getchannel("A"))
+    return out
+
+
+def encode_image(img: Image.Image, format: str, quality: int) -> bytes:
+    """Encode image in memory and return the encoded bytes."""
     save_kwargs = {}
 
     if format.upper() in ["JPEG", "JPG"]:
         format = "JPEG"
         save_kwargs["quality"] = quality
         save_kwargs["optimize"] = True
-        # Convert RGBA to RGB for JPEG
-        if img.mode == "RGBA":
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[3])
-            img = background
+        # Progressive 4:2:0 compresses better at the same perceived quality
+        save_kwargs["progressive"] = True
+        save_kwargs["subsampling"] = 2
+        img = _to_rgb(img)
     elif format.upper() == "WEBP":
         save_kwargs["quality"] = quality
         save_kwargs["method"] = 6  # Best compression
     elif format.upper() == "PNG":
         save_kwargs["optimize"] = True
 
-    img.save(output_path, format=format, **save_kwargs)
-    return output_path.stat().st_size
+    buf = io.BytesIO()
+    img.save(buf, format=format, **save_kwargs)
+    return buf.getvalue()
+
+
+def save_image(img: Image.Image, output_path: Path, format: str, quality: int) -> int:
+    """Save image and return file size."""
+    data = encode_image(img, format, quality)
+    output_path.write_bytes(data)
+    return len(data)
+
+
+def encode_vips(img, format: str, quality: int) -> bytes:
+    """Encode a pyvips image in memory and return the encoded bytes."""
+    format = format.upper()
+    if format in ["JPEG", "JPG"]:
+        # Flatten alpha onto white, matching the Pillow path
+        if img.hasalpha():
+            img = img.flatten(background=[255, 255, 255])
+        return img.write_to_buffer(f".jpg[Q={quality},strip,optimize_coding,interlace,subsample_mode=on]")
+    if format == "WEBP":
+        return img.write_to_buffer(f".webp[Q={quality},effort=6]")
+    if format == "PNG":
+        return img.write_to_buffer(".png[compression=9]")
+    return img.write_to_buffer(f".{format.lower()}")
+
+
+def encode_under_size(img, format: str, quality: int,
+                      min_quality: int, max_size: int, encode=encode_image) -> tuple:
+    """Find the highest quality in [min_quality, quality] that fits max_size.
+
+    Binary search over quality, encoding in memory, so only ~log2(range)
+    encodes are needed. Lossless formats are encoded once since quality has
+    no effect on them. Returns (quality, data); if nothing fits, data is the
+    min_quality encoding.
+    """
+    data = encode(img, format, quality)
+    if len(data) <= max_size or quality <= min_quality:
+        return quality, data
+    if format.upper() not in ("JPEG", "JPG", "WEBP"):
+        return quality, data
+
+    best = None
+    lo, hi = min_quality, quality - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = encode(img, format, mid)
+        if len(candidate) <= max_size:
+            best = (mid, candidate)
+            lo = mid + 1
+        else:
+            if mid == min_quality:
+                best = (mid, candidate)
+            hi = mid - 1
+
+    return best
+
+
+def _optimize_vips(input_path: Path, output_path: Path, platform: str,
+                   target_format: str = None, quality: int = None) -> dict:
+    """Optimize image for a platform with libvips.
+
+    thumbnail() shrinks on load and streams the decode, so large inputs are
+    never held at full resolution.
+    """
+    spec = PLATFORM_SPECS[platform]
+    max_w, max_h, max_size = spec["max_width"], spec["max_height"], spec["max_size"]
+
+    original_size = input_path.stat().st_size
+    source = pyvips.Image.new_from_file(str(input_path))
+    original_dims = (source.width, source.height)
+    # Loader names look like "jpegload" or "pngload_source"
+    in_format = source.get("vips-loader").split("load")[0].upper()
+
+    # The thumbnail pipeline reads the source sequentially, so it can only be
+    # encoded once; render it to memory so each quality probe reuses the pixels
+    img = pyvips.Image.thumbnail(str(input_path), max_w, height=max_h, size="down")
+    img = img.copy_memory()
+
+    if target_format:
+        out_format = target_format.upper()
+    elif in_format in spec["formats"]:
+        out_format = in_format
+    else:
+        out_format = spec["default_format"]
+
+    if quality is None:
+        quality = spec["default_quality"]
+
+    quality, data = encode_under_size(img, out_format, quality, 30, max_size, encode=encode_vips)
+    output_path.write_bytes(data)
+    file_size = len(data)
+
+    return {
+        "success": file_size <= max_size,
+        "input_path": str(input_path),
+        "output_path": str(output_path),
+        "original_size": original_size,
+        "original_dims": original_dims,
+        "final_size": file_size,
+        "final_dims": (img.width, img.height),
+        "format": out_format,
+        "quality": quality,
+        "platform": platform
+    }
 
 
 def optimize_for_platform(input_path: Path, output_path: Path, platform: str,
-                          target_format: str = None, quality: int = None) -> dict:
+                          target_format: str = None, quality: int = None,
+                          backend: str = "pillow") -> dict:
     """Optimize image for a specific platform."""
     spec = PLATFORM_SPECS.get(platform)
     if not spec:
         raise ValueError(f"Unknown platform: {platform}")
+    if backend == "vips":
+        if pyvips is None:
+            raise ValueError("pyvips not installed. Run: pip install pyvips")
+        return _optimize_vips(input_path, output_path, platform, target_format, quality)
+    max_w, max_h, max_size = spec["max_width"], spec["max_height"], spec["max_size"]
 
     with Image.open(input_path) as img:
         original_size = input_path.stat().st_size
         original_dims = (img.width, img.height)
 
+        # Let libjpeg decode large JPEGs at 1/2, 1/4 or 1/8 scale; the 2x
+        # cushion leaves LANCZOS headroom for the final resize.
+        if img.format in ("JPEG", "MPO") and (
+            img.width > max_w or img.height > max_h
+        ):
+            img.draft(img.mode, (max_w * 2, max_h * 2))
+
+        # Apply EXIF orientation up front so the resize targets the right axis.
+        # In place, so img keeps its format and no copy is made.
+        ImageOps.exif_transpose(img, in_place=True)
+
         # Resize if needed
-        img = resize_image(img, spec["max_width"], spec["max_height"])
+        img = resize_image(img, max_w, max_h)
 
         # Determine format
         if target_format:
@@ -187,20 +360,24 @@ def optimize_for_platform(input_path: Path, output_path: Path, platform: str,
         else:
             out_format = spec["default_format"]
 
-        # Determine quality
-        if quality is None:
-            quality = spec["default_quality"]
-
-        # Save with initial quality
-        file_size = save_image(img, output_path, out_format, quality)
+        # Already compliant and nothing requested: copy the bytes, skip the encode
+        if (img.size == original_dims and original_size <= max_size
+                and img.format == out_format and not target_format and quality is None):
+            if output_path.resolve() != input_path.resolve():
+                shutil.copyfile(input_path, output_path)
+            file_size = original_size
+        else:
+            # Determine quality
+            if quality is None:
+                quality = spec["default_quality"]
 
-        # If still too large, iterate with lower quality
-        while file_size > spec["max_size"] and quality > 30:
-            quality -= 10
-            file_size = save_image(img, output_path, out_format, quality)
+            # Lower quality until the file fits, then write it once
+            quality, data = encode_under_size(img, out_format, quality, 30, max_size)
+            output_path.write_bytes(data)
+            file_size = len(data)
 
         return {
-            "success": file_size <= spec["max_size"],
+            "success": file_size <= max_size,
             "input_path": str(input_path),
             "output_path": str(output_path),
             "original_size": original_size,
@@ -225,6 +402,10 @@ def cmd_resize(args):
         print(f"Available: {', '.join(PLATFORM_SPECS.keys())}")
         return 1
 
+    if args.backend == "vips" and pyvips is None:
+        print("Error: pyvips not installed. Run: pip install pyvips")
+        return 1
+
     if args.output:
         output_path = Path(args.output)
     else:
@@ -234,7 +415,8 @@ def cmd_resize(args):
     result = optimize_for_platform(
         input_path, output_path, args.platform,
         target_format=args.format,
-        quality=args.quality
+        quality=args.quality,
+        backend=args.backend
     )
 
     if args.format_output == "json":
@@ -244,7 +426,8 @@ def cmd_resize(args):
         print(f"        {result['original_dims'][0]}x{result['original_dims'][1]}, {format_size(result['original_size'])}")
         print(f"Output: {result['output_path']}")
         print(f"        {result['final_dims'][0]}x{result['final_dims'][1]}, {format_size(result['final_size'])}")
-        print(f"Format: {result['format']}, Quality: {result['quality']}")
+        quality_str = result['quality'] if result['quality'] is not None else "unchanged (copied)"
+        print(f"Format: {result['format']}, Quality: {quality_str}")
         if result['success']:
             print(f"Status: OK - ready for {args.platform}")
         else:
@@ -269,13 +452,13 @@ def cmd_compress(args):
         # Determine format
         out_format = args.format.upper() if args.format else (img.format or "JPEG")
 
-        file_size = save_image(img, output_path, out_format, quality)
-
-        # If max_size specified, iterate
+        # If max_size specified, search for a quality that fits
         if args.max_size:
-            while file_size > args.max_size and quality > 10:
-                quality -= 5
-                file_size = save_image(img, output_path, out_format, quality)
+            quality, data = encode_under_size(img, out_format, quality, 10, args.max_size)
+            output_path.write_bytes(data)
+            file_size = len(data)
+        else:
+            file_size = save_image(img, output_path, out_format, quality)
 
     print(f"Input:  {input_path} ({format_size(original_size)})")
     print(f"Output: {output_path} ({format_size(file_size)})")
@@ -293,15 +476,19 @@ def cmd_batch(args):
         print(f"Error: Input directory not found: {input_dir}")
         return 1
 
+    if args.backend == "vips" and pyvips is None:
+        print("Error: pyvips not installed. Run: pip install pyvips")
+        return 1
+
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    patterns = args.pattern.split(",")
-    files = []
-    for pattern in patterns:
-        if args.recursive:
-            files.extend(input_dir.rglob(pattern.strip()))
-        else:
-            files.extend(input_dir.glob(pattern.strip()))
+    # One directory walk, matched against all patterns at once (case-insensitive)
+    matcher = re.compile(
+        "|".join(fnmatch.translate(p.strip()) for p in args.pattern.split(",")),
+        re.IGNORECASE,
+    )
+    walker = input_dir.rglob("*") if args.recursive else input_dir.iterdir()
+    files = [f for f in walker if matcher.match(f.name) and f.is_file()]
 
     if not files:
         print(f"No files found matching {args.pattern}")
@@ -309,22 +496,48 @@ def cmd_batch(args):
 
     results = {"success": 0, "failed": 0, "files": []}
 
-    for input_path in files:
-        rel_path = input_path.relative_to(input_dir)
-        output_path = output_dir / rel_path.with_suffix(f".{PLATFORM_SPECS[args.platform]['default_format'].lower()}")
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    default_format = PLATFORM_SPECS[args.platform]["default_format"]
 
-        try:
-            result = optimize_for_platform(input_path, output_path, args.platform)
-            if result["success"]:
-                results["success"] += 1
-            else:
-                results["failed"] += 1
-            results["files"].append(result)
-            print(f"  {rel_path}: {format_size(result['original_size'])} -> {format_size(result['final_size'])}")
-        except Exception as e:
+    # PNG optimize=True holds the GIL for long stretches, so PNG-default
+    # platforms scale better across processes; half the cores leaves room
+    # for zlib.
+    if default_format == "PNG":
+        pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+    else:
+        pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+
+    # Inputs that differ only by extension (a.jpg, a.png) map to the same
+    # output; workers would write it concurrently, so keep the first only.
+    outputs = {}
+    for f in sorted(files):
+        output_path = output_dir / f.relative_to(input_dir).with_suffix(f".{default_format.lower()}")
+        if output_path in outputs:
             results["failed"] += 1
-            print(f"  {rel_path}: ERROR - {e}")
+            print(f"  {f.relative_to(input_dir)}: ERROR - output {output_path} "
+                  f"already used by {outputs[output_path].relative_to(input_dir)}")
+            continue
+        outputs[output_path] = f
+
+    with pool:
+        futures = {}
+        for output_path, f in outputs.items():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            future = pool.submit(optimize_for_platform, f, output_path, args.platform,
+                                 backend=args.backend)
+            futures[future] = f
+        for future in as_completed(futures):
+            rel_path = futures[future].relative_to(input_dir)
+            try:
+                result = future.result()
+                if result["success"]:
+                    results["success"] += 1
+                else:
+                    results["failed"] += 1
+                results["files"].append(result)
+                print(f"  {rel_path}: {format_size(result['original_size'])} -> {format_size(result['final_size'])}")
+            except Exception as e:
+                results["failed"] += 1
+                print(f"  {rel_path}: ERROR - {e}")
 
     print(f"\nProcessed: {results['success']} success, {results['failed']} failed")
     return 0 if results["failed"] == 0 else 1
@@ -333,12 +546,13 @@ def cmd_batch(args):
 def cmd_info(args):
     """Get image information."""
     path = Path(args.path)
-    if not path.exists():
+    try:
+        with Image.open(path) as img:
+            info = get_image_info(path, img)
+    except FileNotFoundError:
         print(f"Error: File not found: {path}")
         return 1
 
-    info = get_image_info(path)
-
     if args.check_platforms:
         info["platforms"] = {}
         for platform in PLATFORM_SPECS:
@@ -385,12 +599,15 @@ def cmd_convert(args):
 # Default watermark assets — configure with your own logo paths
 DEFAULT_WATERMARKS = {}
 
-# Corner positions
+# Q8 luminance weights for uint8 RGB, summed in uint16 without overflow
+LUMA_WEIGHTS = np.array([77, 150, 29], dtype=np.uint16)
+
+# Corner positions as (right, bottom) flags: 1 anchors to the far edge
 CORNER_POSITIONS = {
-    "bottom-right": lambda iw, ih, ww, wh, m: (iw - ww - m, ih - wh - m),
-    "bottom-left":  lambda iw, ih, ww, wh, m: (m, ih - wh - m),
-    "top-right":    lambda iw, ih, ww, wh, m: (iw - ww - m, m),
-    "top-left":     lambda iw, ih, ww, wh, m: (m, m),
+    "bottom-right": (1, 1),
+    "bottom-left":  (0, 1),
+    "top-right":    (1, 0),
+    "top-left":     (0, 0),
 }
 
 
@@ -408,17 +625,12 @@ def prepare_watermark(logo_path: str, target_size: int, opacity: float) -> Image
 
     if alpha_min == alpha_max == 255:
         # No real transparency — assume black background, create alpha from luminance
-        r, g, b, _ = logo.split()
-        # Luminance: brighter pixels are more opaque
-        lum = Image.eval(r, lambda x: x)  # Start with red channel
-        # Combine channels for proper luminance
-        import numpy as np
         arr = np.array(logo)
-        # Luminance from RGB
-        lum_arr = (0.299 * arr[:, :, 0] + 0.587 * arr[:, :, 1] + 0.114 * arr[:, :, 2]).astype("uint8")
+        # Fixed-point Rec. 601 luminance (77/150/29 ≈ 0.299/0.587/0.114 * 256)
+        lum = np.dot(arr[:, :, :3], LUMA_WEIGHTS)
         # Use luminance as alpha (black=transparent, bright=opaque)
-        arr[:, :, 3] = lum_arr
-        logo = Image.fromarray(arr)
+        np.right_shift(lum, 8, out=arr[:, :, 3], casting="unsafe")
+        logo = Image.fromarray(arr, "RGBA")
 
     # Resize to target size (maintain aspect ratio)
     ratio = target_size / max(logo.width, logo.height)
@@ -428,13 +640,25 @@ def prepare_watermark(logo_path: str, target_size: int, opacity: float) -> Image
 
     # Apply opacity
     if opacity < 1.0:
-        r, g, b, a = logo.split()
-        a = Image.eval(a, lambda x: int(x * opacity))
-        logo = Image.merge("RGBA", (r, g, b, a))
+        arr = np.array(logo)
+        # Q8 fixed-point multiply keeps the scale in integer arithmetic
+        alpha = arr[:, :, 3].astype(np.uint16)
+        alpha *= int(opacity * 256)
+        np.right_shift(alpha, 8, out=arr[:, :, 3], casting="unsafe")
+        logo = Image.fromarray(arr, "RGBA")
 
     return logo
 
 
+@functools.lru_cache(maxsize=32)
+def _prepare_watermark_cached(logo_path: str, target_size: int, opacity: float) -> Image.Image:
+    """prepare_watermark() memoized for batches, where most images share a width.
+
+    The returned logo is shared between callers and must not be mutated.
+    """
+    return prepare_watermark(logo_path, target_size, opacity)
+
+
 def apply_watermark(
     img: Image.Image,
     logo: Image.Image,
@@ -455,14 +679,17 @@ def apply_watermark(
     img = img.convert("RGBA")
     margin = int(img.width * margin_pct / 100)
 
-    pos_fn = CORNER_POSITIONS.get(position, CORNER_POSITIONS["bottom-right"])
-    x, y = pos_fn(img.width, img.height, logo.width, logo.height, margin)
-
-    # Create a transparent layer and paste the logo onto it
-    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    overlay.paste(logo, (x, y))
+    right, bottom = CORNER_POSITIONS.get(position, CORNER_POSITIONS["bottom-right"])
+    x = img.width - logo.width - margin if right else margin
+    y = img.height - logo.height - margin if bottom else margin
 
-    return Image.alpha_composite(img, overlay)
+    # Composite in place over the logo's box only; img is a fresh copy
+    # from convert(), so mutating it is safe. A logo bigger than the image
+    # (wide, short banners) lands at a negative offset, which alpha_composite
+    # rejects before Pillow 10.1; clip the hidden part off via source instead.
+    img.alpha_composite(logo, dest=(max(0, x), max(0, y)),
+                        source=(max(0, -x), max(0, -y)))
+    return img
 
 
 def watermark_single(
@@ -490,17 +717,16 @@ def watermark_single(
     """
     with Image.open(input_path) as img:
         original_format = img.format or "PNG"
+        ImageOps.exif_transpose(img, in_place=True)
         target_size = int(img.width * size_pct / 100)
-        logo = prepare_watermark(logo_path, target_size, opacity)
+        logo = _prepare_watermark_cached(logo_path, target_size, opacity)
         result = apply_watermark(img, logo, position, margin_pct)
 
         # Determine output format from extension
         ext = output_path.suffix.lower()
         if ext in [".jpg", ".jpeg"]:
             # Flatten alpha for JPEG
-            bg = Image.new("RGB", result.size, (0, 0, 0))
-            bg.paste(result, mask=result.split()[3])
-            bg.save(output_path, "JPEG", quality=95, optimize=True)
+            _to_rgb(result, bg=(0, 0, 0)).save(output_path, "JPEG", quality=95, optimize=True)
         elif ext == ".webp":
             result.save(output_path, "WEBP", quality=95)
         else:
@@ -543,15 +769,20 @@ def cmd_watermark(args):
             return 0
 
         count = 0
-        for f in sorted(files):
-            out = output_dir / f.name
-            try:
-                watermark_single(f, out, logo_path, args.size, args.opacity,
-                                 args.position, args.margin)
-                count += 1
-                print(f"  ✅ {f.name}")
-            except Exception as e:
-                print(f"  ❌ {f.name}: {e}")
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            futures = {
+                pool.submit(watermark_single, f, output_dir / f.name, logo_path,
+                            args.size, args.opacity, args.position, args.margin): f
+                for f in sorted(files)
+            }
+            for future in as_completed(futures):
+                f = futures[future]
+                try:
+                    future.result()
+                    count += 1
+                    print(f"  ✅ {f.name}")
+                except Exception as e:
+                    print(f"  ❌ {f.name}: {e}")
 
         print(f"\nWatermarked {count}/{len(files)} images → {output_dir}")
     else:
@@ -587,6 +818,8 @@ def main():
     resize_parser.add_argument("--format", help="Output format")
     resize_parser.add_argument("--quality", type=int, help="Quality 1-100")
     resize_parser.add_argument("--format-output", choices=["text", "json"], default="text")
+    resize_parser.add_argument("--backend", choices=["pillow", "vips"], default="pillow",
+                               help="Image backend (vips requires pyvips)")
 
     # Compress command
     compress_parser = subparsers.add_parser("compress", help="Compress image")
@@ -603,6 +836,8 @@ def main():
     batch_parser.add_argument("--platform", required=True, choices=list(PLATFORM_SPECS.keys()))
     batch_parser.add_argument("--pattern", default="*.png,*.jpg,*.jpeg,*.webp", help="File pattern")
     batch_parser.add_argument("--recursive", action="store_true", help="Process subdirectories")
+    batch_parser.add_argument("--backend", choices=["pillow", "vips"], default="pillow",
+                              help="Image backend (vips requires pyvips)")
 
     # Info command
     info_parser = subparsers.add_parser("info", help="Get image info")
@@ -628,7 +863,7 @@ def main():
     wm_parser.add_argument("--opacity", type=float, default=0.4,
                            help="Logo opacity 0.0-1.0 (default: 0.4)")
     wm_parser.add_argument("--position", default="bottom-right",
-                           choices=["bottom-right", "bottom-left", "top-right", "top-left"],
+                           choices=list(CORNER_POSITIONS),
                            help="Corner placement (default: bottom-right)")
     wm_parser.add_argument("--margin", type=float, default=2.0,
                            help="Edge margin as %% of image width (default: 2.0)")
@@ -0,0 +1,102 @@
+"""Regression tests for optimize.py. Run from this directory: python -m unittest"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+import optimize
+
+
+def _noise(width: int, height: int) -> Image.Image:
+    """Random RGB noise, which compresses badly and forces quality probes."""
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), "RGB")
+
+
+class ResizeImageTest(unittest.TestCase):
+    def test_palette_image_skips_reduce(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "wide.png"
+            out = Path(tmp) / "out.png"
+            _noise(16400, 400).quantize(16).save(src)
+
+            result = optimize.optimize_for_platform(src, out, "gallery")
+
+            self.assertTrue(result["success"])
+            self.assertEqual(result["final_dims"], (4096, 99))
+
+    def test_modes_without_reduce_still_resize(self):
+        for mode in ("1", "P", "I;16"):
+            with self.subTest(mode=mode):
+                img = optimize.resize_image(Image.new(mode, (1600, 400)), 200, 200)
+                self.assertEqual(img.size, (200, 50))
+
+
+class ApplyWatermarkTest(unittest.TestCase):
+    def test_logo_taller_than_image_is_clipped(self):
+        img = Image.new("RGB", (1000, 50), "black")
+        logo = Image.new("RGBA", (50, 50), "white")
+        composite = Image.Image.alpha_composite
+
+        def strict_composite(self, im, dest=(0, 0), source=(0, 0)):
+            # Pillow < 10.1 (and Pillow-SIMD 9.5) reject negative offsets
+            if min(dest) < 0:
+                raise ValueError("Destination must be non-negative")
+            return composite(self, im, dest, source)
+
+        with mock.patch.object(Image.Image, "alpha_composite", strict_composite):
+            out = optimize.apply_watermark(img, logo, "bottom-right", margin_pct=2.0)
+
+        # x = 1000 - 50 - 20, y = 50 - 50 - 20: only the logo's top 30 rows fit
+        self.assertEqual(out.size, (1000, 50))
+        self.assertEqual(out.convert("L").getbbox(), (930, 0, 980, 30))
+
+
+class BatchTest(unittest.TestCase):
+    def test_inputs_with_same_stem_do_not_share_an_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = Path(tmp) / "in", Path(tmp) / "out"
+            src.mkdir()
+            _noise(64, 64).save(src / "a.jpg")
+            _noise(32, 32).save(src / "a.png")
+            args = argparse.Namespace(input_dir=str(src), output_dir=str(dst),
+                                      platform="twitter", pattern="*.png,*.jpg",
+                                      recursive=False, backend="pillow")
+
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                rc = optimize.cmd_batch(args)
+
+            self.assertEqual(rc, 1)
+            self.assertIn("a.png: ERROR - output", stdout.getvalue())
+            self.assertEqual([p.name for p in dst.iterdir()], ["a.jpeg"])
+            with Image.open(dst / "a.jpeg") as out:
+                self.assertEqual(out.size, (64, 64))
+
+
+class OptimizeVipsTest(unittest.TestCase):
+    @unittest.skipIf(optimize.pyvips is None, "pyvips not installed")
+    def test_resize_when_first_encode_is_too_large(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "noise.jpg"
+            out = Path(tmp) / "out.jpg"
+            _noise(2400, 1800).save(src, quality=95)
+
+            result = optimize.optimize_for_platform(src, out, "bluesky", backend="vips")
+
+            spec = optimize.PLATFORM_SPECS["bluesky"]
+            self.assertTrue(result["success"])
+            self.assertLess(result["quality"], spec["default_quality"])
+            self.assertEqual(result["final_size"], out.stat().st_size)
+            self.assertLessEqual(result["final_size"], spec["max_size"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,23 +4,38 @@ Matrix Skill — Send messages, read channels, upload media, and manage
 reactions in Matrix rooms.
 
 Unified tool with structured error handling, rate-limit awareness,
-and room alias resolution. Uses only stdlib (no external dependencies).
+and room alias resolution. Uses only stdlib (no external dependencies);
+orjson is used for faster JSON decoding and encoding when installed.
 """
 
-import argparse
+import functools
+import http.client
 import json
+import mimetypes
 import os
+import random
+import re
 import sys
+import threading
 import time
-import urllib.error
 import urllib.parse
-import urllib.request
-from datetime import datetime, timezone, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import takewhile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
 
 
 # ─── Configuration ──────────────────────────────────────────────────────────
 
 HOMESERVER = os.environ.get("MATRIX_HOMESERVER_URL", "").rstrip("/")
+# Parsed once; the path part is any prefix the homeserver is mounted under
+_HS_PARTS = urllib.parse.urlsplit(HOMESERVER)
 ACCESS_TOKEN = os.environ.get("MATRIX_ACCESS_TOKEN", "")
 MATRIX_USER = os.environ.get("MATRIX_USER", "")
 MATRIX_PASSWORD = os.environ.get("MATRIX_PASSWORD", "")
@@ -28,6 +43,24 @@ SERVER_NAME = os.environ.get("MATRIX_SERVER_NAME", "")
 DEFAULT_ROOM = os.environ.get("MATRIX_DEFAULT_ROOM", "")
 MAX_RETRIES = int(os.environ.get("MATRIX_MAX_RETRIES", "5"))
 
+# Bytes of an HTTP error body kept for messages and retry_after_ms
+ERROR_BODY_LIMIT = 4096
+
+# Retry backoff for 5xx and connection errors, in seconds
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Socket write size when streaming uploads; files above the threshold
+# are handed to socket.sendfile() instead
+UPLOAD_BLOCKSIZE = 64 * 1024
+SENDFILE_THRESHOLD = 4 * 1024 * 1024
+
+# Concurrent room fetches for read --all
+READ_WORKERS = 8
+
+# Concurrent media uploads ahead of the (serial) sends in batch
+BATCH_UPLOADS = 3
+
 # JSON dict of shortname -> alias local part, e.g. {"home": "home", "dev": "dev"}
 _raw_aliases = os.environ.get("MATRIX_ROOM_ALIASES", "")
 ROOM_ALIASES = json.loads(_raw_aliases) if _raw_aliases else {}
@@ -39,16 +72,27 @@ BOT_USERS = set(json.loads(_raw_bots)) if _raw_bots else set()
 
 # ─── Token Management ──────────────────────────────────────────────────────
 
-_cached_token = None
+# Auto-login token, refreshed shortly before the server says it expires
+_token_cache = {"token": None, "expires_at": 0.0}
+TOKEN_REFRESH_MARGIN = 30.0
+# Serializes auto-login, so pool workers that all miss the cache log in once
+_token_lock = threading.Lock()
+
+
+def _cached_token():
+    """Return the auto-login token if it has not expired, else None."""
+    if _token_cache["token"] and time.monotonic() < _token_cache["expires_at"]:
+        return _token_cache["token"]
+    return None
 
 
 def _get_token():
     """Return an access token, using auto-login as fallback."""
-    global _cached_token
     if ACCESS_TOKEN:
         return ACCESS_TOKEN
-    if _cached_token:
-        return _cached_token
+    token = _cached_token()
+    if token:
+        return token
 
     if not MATRIX_USER or not MATRIX_PASSWORD:
         return ""
@@ -56,26 +100,51 @@ def _get_token():
     if not HOMESERVER:
         return ""
 
+    with _token_lock:
+        # Another thread may have logged in while this one waited
+        return _cached_token() or _login()
+
+
+def _login():
+    """Log in with MATRIX_USER/MATRIX_PASSWORD and cache the token."""
     payload = json.dumps({
         "type": "m.login.password",
         "user": MATRIX_USER,
         "password": MATRIX_PASSWORD,
     }).encode()
-    req = urllib.request.Request(
-        f"{HOMESERVER}/_matrix/client/v3/login",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
+    # Log in over the same keep-alive connection the API calls will use. That
+    # socket may have been closed by the server while idle (typically when
+    # the token expires after a long gap), so reconnect once before giving up.
+    for attempt in range(2):
+        try:
+            conn = _get_connection()
+            conn.request(
+                "POST", f"{_HS_PARTS.path}/_matrix/client/v3/login",
+                body=payload, headers={"Content-Type": "application/json"},
+            )
+            resp = conn.getresponse()
+            raw = resp.read()
+            break
+        except (OSError, http.client.HTTPException) as e:
+            _drop_connection()
+            if attempt:
+                raise MatrixError(f"Login failed: {e}")
+
+    if resp.status >= 400:
+        return ""
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = json.loads(resp.read())
-            token = data.get("access_token", "")
-            if token:
-                _cached_token = token
-            return token
-    except Exception:
+        data = _loads(raw)
+    except ValueError:
         return ""
+    token = data.get("access_token", "") if isinstance(data, dict) else ""
+    if token:
+        expires_in_ms = data.get("expires_in_ms")
+        _token_cache["token"] = token
+        _token_cache["expires_at"] = (
+            time.monotonic() + expires_in_ms / 1000 - TOKEN_REFRESH_MARGIN
+            if expires_in_ms else float("inf")
+        )
+    return token
 
 
 # ─── API Layer ──────────────────────────────────────────────────────────────
@@ -85,13 +154,121 @@ class MatrixError(Exception):
     pass
 
 
+# One keep-alive connection per thread, so repeated calls reuse the same
+# TCP/TLS session instead of paying a handshake per request.
+_local = threading.local()
+
+
+def _get_connection():
+    """Return this thread's persistent connection to the homeserver."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if _HS_PARTS.scheme == "https":
+            conn = http.client.HTTPSConnection(
+                _HS_PARTS.netloc, timeout=30, blocksize=UPLOAD_BLOCKSIZE
+            )
+        else:
+            conn = http.client.HTTPConnection(
+                _HS_PARTS.netloc, timeout=30, blocksize=UPLOAD_BLOCKSIZE
+            )
+        _local.conn = conn
+    return conn
+
+
+def _drop_connection():
+    """Close and forget this thread's connection so the next call reconnects."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+class _RateLimiter:
+    """
+    Client-side token bucket that learns the server's rate limit.
+
+    Each call takes a token; when the bucket is empty the caller sleeps until
+    one refills. Every 429 folds retry_after_ms into an EWMA and slows the
+    refill rate to roughly one request per that interval, so later calls
+    pace themselves instead of running into the limit again. Each successful
+    request adds `increase` back, up to the initial rate, so a few transient
+    429s don't throttle the rest of a long run.
+    """
+
+    def __init__(self, rate=10.0, capacity=10, alpha=0.3, min_rate=0.05,
+                 increase=0.1):
+        self.rate = rate
+        self.max_rate = rate
+        self.increase = increase
+        self.capacity = capacity
+        self.alpha = alpha
+        self.min_rate = min_rate
+        self.tokens = float(capacity)
+        self.avg_retry = None
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping first if the bucket is empty."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # Going negative reserves a future token for this caller
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    def rate_limited(self, retry_ms):
+        """Record a 429 and lower the refill rate to match the server."""
+        with self.lock:
+            retry_s = max(retry_ms, 1) / 1000
+            if self.avg_retry is None:
+                self.avg_retry = retry_s
+            else:
+                self.avg_retry = self.alpha * retry_s + (1 - self.alpha) * self.avg_retry
+            self.rate = max(self.min_rate, min(self.rate, 1 / self.avg_retry))
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        """Record a successful request and raise the refill rate additively."""
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+_rate_limiter = _RateLimiter()
+
+
+def _send_request(conn, method, url, body, headers):
+    """Send a request; large file bodies go out via socket.sendfile()."""
+    if hasattr(body, "fileno") and int(headers["Content-Length"]) > SENDFILE_THRESHOLD:
+        conn.putrequest(method, url)
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders()
+        # Zero-copy from the page cache on plain sockets; TLS falls back to send()
+        conn.sock.sendfile(body)
+    else:
+        conn.request(method, url, body=body, headers=headers)
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
 def api_call(method, path, data=None, params=None, raw_body=None,
              content_type="application/json", max_retries=None):
     """
     Make an authenticated API call to Matrix with retry logic.
 
-    Handles 429 rate limits by reading retry_after_ms from the response.
-    Retries on 5xx errors with exponential backoff.
+    Handles 429 rate limits by reading retry_after_ms from the response,
+    and paces calls through a client-side token bucket tuned by those limits.
+    Retries on 5xx errors with jittered exponential backoff.
     Returns parsed JSON response. Raises MatrixError on failure.
 
     Args:
@@ -99,7 +276,8 @@ def api_call(method, path, data=None, params=None, raw_body=None,
         path: API path (e.g. /_matrix/client/v3/...)
         data: Dict to JSON-encode as request body (mutually exclusive with raw_body)
         params: Dict of query parameters
-        raw_body: Raw bytes for request body (used for media upload)
+        raw_body: Raw bytes or a binary file object for the request body
+            (used for media upload; files are streamed, not buffered)
         content_type: Content-Type header value
         max_retries: Override default retry count
     """
@@ -113,7 +291,7 @@ def api_call(method, path, data=None, params=None, raw_body=None,
         )
 
     retries = max_retries if max_retries is not None else MAX_RETRIES
-    url = f"{HOMESERVER}{path}"
+    url = f"{_HS_PARTS.path}{path}"
     if params:
         url += "?" + urllib.parse.urlencode(params)
 
@@ -123,47 +301,82 @@ def api_call(method, path, data=None, params=None, raw_body=None,
     elif data is not None:
         body = json.dumps(data).encode()
 
-    for attempt in range(retries):
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": content_type,
+    }
+
+    if hasattr(body, "read"):
+        headers["Content-Length"] = str(os.fstat(body.fileno()).st_size)
+
+    # A pooled socket the server closed while idle is expected, not a
+    # failure: the first one is retried at once without using up an attempt
+    stale_retry = True
+    attempt = -1
+    while attempt < retries - 1:
+        attempt += 1
+        reused = False
         try:
-            req = urllib.request.Request(
-                url, data=body,
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": content_type,
-                },
-                method=method,
-            )
-            with urllib.request.urlopen(req, timeout=30) as resp:
+            if hasattr(body, "seek"):
+                body.seek(0)
+            _rate_limiter.acquire()
+            conn = _get_connection()
+            reused = conn.sock is not None
+            _send_request(conn, method, url, body, headers)
+            resp = conn.getresponse()
+            if resp.status < 400:
+                _rate_limiter.succeeded()
                 raw = resp.read()
-                if not raw:
-                    return {}
-                return json.loads(raw)
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode("utf-8", errors="replace")
+            else:
+                # Error bodies only feed the message and retry_after_ms: skip a
+                # 5xx that will be retried, and cap the rest at a small prefix
+                if resp.status >= 500 and attempt < retries - 1:
+                    raw = b""
+                else:
+                    raw = resp.read(ERROR_BODY_LIMIT)
+                if not resp.isclosed():
+                    # Unread body left on the socket; reconnect next time
+                    _drop_connection()
+        except (OSError, http.client.HTTPException) as e:
+            # Stale keep-alive socket or network failure — reconnect on retry
+            _drop_connection()
+            if reused and stale_retry:
+                stale_retry = False
+                attempt -= 1
+                continue
+            if attempt < retries - 1:
+                time.sleep(_backoff(attempt))
+                continue
+            raise MatrixError(f"Connection failed: {e}")
+
+        if resp.status >= 400:
+            error_body = raw.decode("utf-8", errors="replace")
             # Rate limit
-            if e.code == 429:
+            if resp.status == 429:
                 try:
                     retry_ms = json.loads(error_body).get("retry_after_ms", 5000)
                 except (json.JSONDecodeError, ValueError):
                     retry_ms = 5000
-                wait = max(1, (retry_ms + 999) // 1000)
+                _rate_limiter.rate_limited(retry_ms)
+                # Jitter on top of the server's delay so clients don't retry in lockstep
+                wait = max(1, (retry_ms + 999) // 1000) + random.uniform(0, 0.5)
                 print(
-                    f"Rate limited. Waiting {wait}s "
+                    f"Rate limited. Waiting {wait:.1f}s "
                     f"(attempt {attempt + 1}/{retries})...",
                     file=sys.stderr,
                 )
                 time.sleep(wait)
                 continue
-            # Server errors — exponential backoff
-            if e.code >= 500 and attempt < retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            raise MatrixError(f"HTTP {e.code}: {error_body}")
-        except urllib.error.URLError as e:
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)
+            # Server errors — exponential backoff with full jitter
+            if resp.status >= 500 and attempt < retries - 1:
+                time.sleep(_backoff(attempt))
                 continue
-            raise MatrixError(f"Connection failed: {e}")
+            raise MatrixError(f"HTTP {resp.status}: {error_body}")
+
+        if not raw:
+            return {}
+        try:
+            return _loads(raw)
         except json.JSONDecodeError:
             return {}
 
@@ -172,13 +385,28 @@ def api_call(method, path, data=None, params=None, raw_body=None,
 
 # ─── Room Resolution ───────────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=256)
+def _quote_id(identifier):
+    """Percent-encode a room or event ID for use as a URL path segment."""
+    return urllib.parse.quote(identifier, safe="")
+
+
+# Aliases and room names don't change within a run; cache both lookups
+_ALIAS_CACHE = {}
+_ROOM_NAME_CACHE = {}
+
+
 def _resolve_alias(alias):
     """Resolve a Matrix room alias (#room:server) to a room ID via directory API."""
+    room_id = _ALIAS_CACHE.get(alias)
+    if room_id:
+        return room_id
     encoded = urllib.parse.quote(alias)
     data = api_call("GET", f"/_matrix/client/v3/directory/room/{encoded}")
     room_id = data.get("room_id")
     if not room_id:
         raise MatrixError(f"Could not resolve alias '{alias}'")
+    _ALIAS_CACHE[alias] = room_id
     return room_id
 
 
@@ -236,17 +464,38 @@ def get_joined_rooms():
 
 def get_room_name(room_id):
     """Get the display name for a room."""
-    # Check alias map first
-    for alias, local_part in ROOM_ALIASES.items():
+    name = _ROOM_NAME_CACHE.get(room_id)
+    if name:
+        return name
+    _ROOM_NAME_CACHE[room_id] = name = _lookup_room_name(room_id)
+    return name
+
+
+_ID_TO_ALIAS = None
+
+
+def _id_to_alias():
+    """Map room ID -> configured shortname, resolving each alias once."""
+    global _ID_TO_ALIAS
+    if _ID_TO_ALIAS is None:
+        _ID_TO_ALIAS = {}
         if SERVER_NAME:
-            try:
-                alias_room_id = _resolve_alias(f"#{local_part}:{SERVER_NAME}")
-                if alias_room_id == room_id:
-                    return alias
-            except MatrixError:
-                pass
+            for alias, local_part in ROOM_ALIASES.items():
+                try:
+                    room_id = _resolve_alias(f"#{local_part}:{SERVER_NAME}")
+                except MatrixError:
+                    continue
+                _ID_TO_ALIAS.setdefault(room_id, alias)
+    return _ID_TO_ALIAS
+
+
+def _lookup_room_name(room_id):
+    """Find a room's name from the alias map, then its m.room.name state."""
+    alias = _id_to_alias().get(room_id)
+    if alias:
+        return alias
     try:
-        encoded = urllib.parse.quote(room_id, safe="")
+        encoded = _quote_id(room_id)
         data = api_call("GET", f"/_matrix/client/v3/rooms/{encoded}/state/m.room.name")
         return data.get("name", room_id)
     except MatrixError:
@@ -260,6 +509,51 @@ def _short_sender(sender):
     return sender.split(":")[0].lstrip("@") if ":" in sender else sender
 
 
+@functools.lru_cache(maxsize=1024)
+def _fmt_minute(minute):
+    """Format a minute since the epoch as local 'YYYY-MM-DD HH:MM'."""
+    tt = time.localtime(minute * 60)
+    return f"{tt.tm_year:04d}-{tt.tm_mon:02d}-{tt.tm_mday:02d} {tt.tm_hour:02d}:{tt.tm_min:02d}"
+
+
+def _fmt_ts(ts_ms):
+    """Format a millisecond timestamp; events in the same minute share one strftime."""
+    return _fmt_minute(ts_ms // 60000)
+
+
+# Leading "> " quote lines of a reply fallback
+_REPLY_FALLBACK_RE = re.compile(r"\A(?:> [^\n]*(?:\n|\Z))+")
+
+_TYPE_LABELS = {
+    "m.text": "text", "m.notice": "notice",
+    "m.image": "image", "m.video": "video",
+    "m.audio": "audio", "m.file": "file", "m.emote": "emote",
+}
+
+_VISIBLE_TYPES = frozenset(("m.room.message", "m.reaction"))
+
+
+def _rel_type(event):
+    """Return an event's m.relates_to rel_type, or None if it has none."""
+    try:
+        return event["content"]["m.relates_to"]["rel_type"]
+    except (KeyError, TypeError):
+        return None
+
+
+def _is_visible(event, from_user=None, humans_only=False):
+    """Whether read should show an event: a non-edit message or reaction
+    that passes the --from and --humans-only filters."""
+    if event.get("type") not in _VISIBLE_TYPES or _rel_type(event) == "m.replace":
+        return False
+    sender = event.get("sender", "")
+    if from_user and from_user not in sender:
+        return False
+    if humans_only and sender in BOT_USERS:
+        return False
+    return True
+
+
 def format_event(event, compact=False):
     """Format a single Matrix event for display."""
     etype = event.get("type", "")
@@ -267,11 +561,12 @@ def format_event(event, compact=False):
     content = event.get("content", {})
     ts = event.get("origin_server_ts", 0)
     event_id = event.get("event_id", "")
-    dt = datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M")
+    dt = _fmt_ts(ts)
 
     if etype == "m.reaction":
-        key = content.get("m.relates_to", {}).get("key", "?")
-        target = content.get("m.relates_to", {}).get("event_id", "?")[:20]
+        relates = content.get("m.relates_to") or {}
+        key = relates.get("key", "?")
+        target = relates.get("event_id", "?")[:20]
         if compact:
             return f"{dt} | reaction {sender} reacted {key} to {target}"
         return f"  reaction {dt} -- {sender} reacted {key}\n    on event {target}"
@@ -279,7 +574,7 @@ def format_event(event, compact=False):
     if etype == "m.room.message":
         body = content.get("body", "")
         msgtype = content.get("msgtype", "m.text")
-        relates = content.get("m.relates_to", {})
+        relates = content.get("m.relates_to") or {}
 
         # Skip message edits (show only final version)
         if relates.get("rel_type") == "m.replace":
@@ -288,25 +583,11 @@ def format_event(event, compact=False):
         reply_to = relates.get("m.in_reply_to", {}).get("event_id", "")
 
         # Strip Matrix reply fallback from body
+        # (the separator blank line is removed by the final strip)
         if body.startswith("> "):
-            lines = body.split("\n")
-            clean_lines = []
-            past_quote = False
-            for line in lines:
-                if past_quote:
-                    clean_lines.append(line)
-                elif not line.startswith("> ") and line.strip() != "":
-                    past_quote = True
-                    clean_lines.append(line)
-                elif line.strip() == "":
-                    past_quote = True
-            body = "\n".join(clean_lines).strip() or body
-
-        type_label = {
-            "m.text": "text", "m.notice": "notice",
-            "m.image": "image", "m.video": "video",
-            "m.audio": "audio", "m.file": "file", "m.emote": "emote",
-        }.get(msgtype, msgtype)
+            body = _REPLY_FALLBACK_RE.sub("", body, count=1).strip() or body
+
+        type_label = _TYPE_LABELS.get(msgtype, msgtype)
 
         if compact:
             body_short = body[:120].replace("\n", " ")
@@ -317,10 +598,13 @@ def format_event(event, compact=False):
         if reply_to:
             lines[0] += f"  (reply to {reply_to[:20]})"
         lines.append(f"    {event_id}")
-        for line in body.split("\n")[:10]:
-            lines.append(f"    {line}")
-        if body.count("\n") > 10:
-            lines.append(f"    ... ({body.count(chr(10)) - 10} more lines)")
+        # Split at most 10 times; only count the remainder when it's there
+        body_lines = body.split("\n", 10)
+        lines.extend(f"    {line}" for line in body_lines[:10])
+        if len(body_lines) > 10:
+            extra = body.count("\n") - 10
+            if extra > 0:
+                lines.append(f"    ... ({extra} more lines)")
         return "\n".join(lines)
 
     return None
@@ -328,41 +612,55 @@ def format_event(event, compact=False):
 
 def format_events(events, compact=False):
     """Format a list of events for display (chronological order)."""
-    events = list(reversed(events))
-    lines = []
-    for event in events:
-        formatted = format_event(event, compact=compact)
-        if formatted:
-            lines.append(formatted)
+    formatted = (format_event(event, compact=compact) for event in reversed(events))
+    lines = [f for f in formatted if f]
     return "\n".join(lines) if lines else "(no messages)"
 
 
+def _print_json(obj):
+    """Print obj as indented JSON, encoding with orjson when available."""
+    if orjson:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(
+            orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        )
+    else:
+        print(json.dumps(obj, indent=2))
+
+
 # ─── Media Helpers ─────────────────────────────────────────────────────────
 
+# Explicit map for types mimetypes may not know (or gets wrong)
+_MIMETYPE_OVERRIDES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".mov": "video/quicktime",
+    ".mkv": "video/x-matroska",
+    ".avi": "video/x-msvideo",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".flac": "audio/flac",
+    ".wav": "audio/wav",
+}
+
+
+@functools.lru_cache(maxsize=256)
 def _guess_mimetype(filepath):
-    """Guess MIME type from file extension, with fallbacks for types
-    not in Python's mimetypes db."""
+    """Guess MIME type from file extension: explicit overrides first,
+    then Python's mimetypes db."""
     ext = os.path.splitext(filepath)[1].lower()
-    # Explicit map for types mimetypes may not know
-    known = {
-        ".png": "image/png",
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".gif": "image/gif",
-        ".webp": "image/webp",
-        ".mp4": "video/mp4",
-        ".webm": "video/webm",
-        ".mov": "video/quicktime",
-        ".mkv": "video/x-matroska",
-        ".avi": "video/x-msvideo",
-        ".mp3": "audio/mpeg",
-        ".ogg": "audio/ogg",
-        ".flac": "audio/flac",
-        ".wav": "audio/wav",
-    }
-    return known.get(ext, "application/octet-stream")
+    mimetype = _MIMETYPE_OVERRIDES.get(ext)
+    if mimetype:
+        return mimetype
+    return mimetypes.guess_type(filepath)[0] or "application/octet-stream"
 
 
+@functools.lru_cache(maxsize=32)
 def _detect_msgtype(mimetype):
     """Determine Matrix msgtype from MIME type."""
     if mimetype.startswith("image/"):
@@ -374,22 +672,20 @@ def _detect_msgtype(mimetype):
     return "m.file"
 
 
-def upload_media(filepath):
+def upload_media(filepath, mimetype=None):
     """Upload a file to the Matrix media repo. Returns mxc:// URI."""
     filename = os.path.basename(filepath)
-    mimetype = _guess_mimetype(filepath)
+    mimetype = mimetype or _guess_mimetype(filepath)
 
+    # Stream the file from disk rather than reading it all into memory
     with open(filepath, "rb") as f:
-        file_bytes = f.read()
-
-    encoded_name = urllib.parse.quote(filename, safe="")
-    data = api_call(
-        "POST",
-        f"/_matrix/media/v3/upload",
-        params={"filename": encoded_name},
-        raw_body=file_bytes,
-        content_type=mimetype,
-    )
+        data = api_call(
+            "POST",
+            f"/_matrix/media/v3/upload",
+            params={"filename": filename},
+            raw_body=f,
+            content_type=mimetype,
+        )
     mxc = data.get("content_uri", "")
     if not mxc:
         raise MatrixError(f"Upload failed: {json.dumps(data)}")
@@ -401,7 +697,7 @@ def upload_media(filepath):
 def cmd_send(args):
     """Send a text message to a Matrix room."""
     room_id = resolve_room(args.room)
-    encoded_room = urllib.parse.quote(room_id, safe="")
+    encoded_room = _quote_id(room_id)
 
     payload = {"msgtype": "m.text", "body": args.message}
     response = api_call(
@@ -417,6 +713,48 @@ def cmd_send(args):
         sys.exit(1)
 
 
+def _fetch_messages(room_id, limit):
+    """Fetch the newest events in a room (newest first)."""
+    encoded = _quote_id(room_id)
+    params = {"dir": "b", "limit": str(limit)}
+    data = api_call(
+        "GET", f"/_matrix/client/v3/rooms/{encoded}/messages", params=params
+    )
+    return data.get("chunk", [])
+
+
+def _sync_timelines(room_ids, limit):
+    """
+    Fetch the latest timeline of several rooms with one filtered /sync.
+
+    Returns {room_id: events} for the rooms present in the response, newest
+    first to match /messages?dir=b.
+    """
+    sync_filter = {
+        "presence": {"types": []},
+        "account_data": {"types": []},
+        "room": {
+            "rooms": room_ids,
+            "timeline": {"limit": limit},
+            "state": {"types": []},
+            "ephemeral": {"types": []},
+            "account_data": {"types": []},
+        },
+    }
+    data = api_call(
+        "GET", "/_matrix/client/v3/sync",
+        params={"filter": json.dumps(sync_filter, separators=(",", ":"))},
+    )
+    timelines = {}
+    for room_id, room in data.get("rooms", {}).get("join", {}).items():
+        events = room.get("timeline", {}).get("events", [])
+        # Sync events omit room_id; add it back so --json output matches /messages
+        for e in events:
+            e.setdefault("room_id", room_id)
+        timelines[room_id] = events[::-1]
+    return timelines
+
+
 def cmd_read(args):
     """Read recent messages from a Matrix room."""
     # Determine rooms to check
@@ -426,39 +764,41 @@ def cmd_read(args):
         rooms = [resolve_room(args.room)]
 
     all_results = {}
+    cutoff_ts = None
+    if args.since:
+        cutoff_ts = (time.time() - args.since * 60) * 1000
+
+    # --all: one filtered /sync covers every room in a single request
+    timelines = {}
+    if len(rooms) > 1:
+        try:
+            timelines = _sync_timelines(rooms, args.limit)
+        except MatrixError:
+            pass
+
+    # Anything /sync didn't return falls back to /messages; rooms are
+    # independent, so fetch them concurrently (one connection each)
+    missing = [r for r in rooms if r not in timelines]
+    if len(missing) > 1:
+        with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(missing))) as pool:
+            timelines.update(zip(missing, pool.map(lambda r: _fetch_messages(r, args.limit), missing)))
+    else:
+        timelines.update((r, _fetch_messages(r, args.limit)) for r in missing)
 
     for room_id in rooms:
-        encoded = urllib.parse.quote(room_id, safe="")
-        params = {"dir": "b", "limit": str(args.limit)}
-        data = api_call(
-            "GET", f"/_matrix/client/v3/rooms/{encoded}/messages", params=params
-        )
-        events = data.get("chunk", [])
-
-        # Filter by time
-        if args.since:
-            cutoff_ts = (
-                datetime.now(timezone.utc) - timedelta(minutes=args.since)
-            ).timestamp() * 1000
-            events = [e for e in events if e.get("origin_server_ts", 0) >= cutoff_ts]
-
-        # Filter by sender
-        if args.from_user:
-            events = [e for e in events if args.from_user in e.get("sender", "")]
-
-        # Filter to humans only
-        if args.humans_only:
-            events = [e for e in events if e.get("sender", "") not in BOT_USERS]
-
-        # Only include rooms with visible content
-        if events:
-            visible = [
-                e for e in events
-                if e.get("type") in ("m.room.message", "m.reaction")
-                and e.get("content", {}).get("m.relates_to", {}).get("rel_type") != "m.replace"
-            ]
-            if visible:
-                all_results[room_id] = visible
+        events = timelines[room_id]
+
+        # Filter by time. /messages?dir=b returns newest first, so stop at
+        # the first event older than the cutoff.
+        if cutoff_ts:
+            events = takewhile(
+                lambda e: e.get("origin_server_ts", 0) >= cutoff_ts, events
+            )
+
+        # Time, sender, and visibility filters fused into a single pass
+        visible = [e for e in events if _is_visible(e, args.from_user, args.humans_only)]
+        if visible:
+            all_results[room_id] = visible
 
     # Output
     if args.json:
@@ -466,7 +806,7 @@ def cmd_read(args):
         for room_id, events in all_results.items():
             name = get_room_name(room_id)
             output[name] = events
-        print(json.dumps(output, indent=2))
+        _print_json(output)
     else:
         if not all_results:
             since_str = f"last {args.since} minutes" if args.since else "all time"
@@ -478,15 +818,18 @@ def cmd_read(args):
             print(f"No messages{filter_str} in {since_str}.")
             return
 
+        # Build the whole report and write it once
+        out = []
         for room_id, events in all_results.items():
             name = get_room_name(room_id)
-            formatted = format_events(events, compact=args.compact)
-            visible_count = len(events)
-            print(f"\n{'=' * 50}")
-            print(f"  {name}  ({visible_count} messages)")
-            print(f"{'=' * 50}")
-            print(formatted)
-            print()
+            out += [
+                f"\n{'=' * 50}",
+                f"  {name}  ({len(events)} messages)",
+                f"{'=' * 50}",
+                format_events(events, compact=args.compact),
+                "",
+            ]
+        sys.stdout.write("\n".join(out) + "\n")
 
 
 def cmd_rooms(args):
@@ -519,10 +862,10 @@ def cmd_attach(args):
     mimetype = _guess_mimetype(args.file)
     msgtype = _detect_msgtype(mimetype)
     filesize = os.path.getsize(args.file)
+    encoded_room = _quote_id(room_id)
 
     # Send caption first if provided
     if args.caption:
-        encoded_room = urllib.parse.quote(room_id, safe="")
         api_call(
             "POST",
             f"/_matrix/client/v3/rooms/{encoded_room}/send/m.room.message",
@@ -530,9 +873,8 @@ def cmd_attach(args):
         )
 
     print(f"Uploading {filename}...", file=sys.stderr)
-    mxc_uri = upload_media(args.file)
+    mxc_uri = upload_media(args.file, mimetype)
 
-    encoded_room = urllib.parse.quote(room_id, safe="")
     payload = {
         "msgtype": msgtype,
         "body": filename,
@@ -558,7 +900,7 @@ def cmd_attach(args):
 def cmd_react(args):
     """Send a reaction to an event."""
     room_id = resolve_room(args.room)
-    encoded_room = urllib.parse.quote(room_id, safe="")
+    encoded_room = _quote_id(room_id)
 
     payload = {
         "m.relates_to": {
@@ -580,38 +922,62 @@ def cmd_react(args):
         sys.exit(1)
 
 
-def cmd_reactions(args):
-    """Query reactions on a specific event."""
-    room_id = resolve_room(args.room)
-    encoded_room = urllib.parse.quote(room_id, safe="")
-    encoded_event = urllib.parse.quote(args.event_id, safe="")
+def _fetch_reactions(room_id, event_ids):
+    """
+    Fetch m.annotation reactions for several events in one wave.
 
-    try:
-        data = api_call(
-            "GET",
-            f"/_matrix/client/v1/rooms/{encoded_room}/relations/{encoded_event}/m.annotation",
-        )
-        reactions = data.get("chunk", [])
-    except MatrixError:
-        # Fallback: scan recent messages for reactions targeting this event
-        params = {"dir": "b", "limit": "100"}
-        data = api_call(
-            "GET", f"/_matrix/client/v3/rooms/{encoded_room}/messages", params=params
-        )
-        reactions = []
-        for e in data.get("chunk", []):
+    Relations lookups run concurrently. Any that fail are answered together
+    from a single scan of recent messages. Returns {event_id: [reactions]}.
+    """
+    encoded_room = _quote_id(room_id)
+
+    def relations(event_id):
+        encoded_event = _quote_id(event_id)
+        try:
+            data = api_call(
+                "GET",
+                f"/_matrix/client/v1/rooms/{encoded_room}/relations/{encoded_event}/m.annotation",
+            )
+            return data.get("chunk", [])
+        except MatrixError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(event_ids))) as pool:
+        found = dict(zip(event_ids, pool.map(relations, event_ids)))
+
+    missing = {event_id for event_id, chunk in found.items() if chunk is None}
+    if missing:
+        # Fallback: scan recent messages once for reactions targeting any of them
+        for event_id in missing:
+            found[event_id] = []
+        for e in _fetch_messages(room_id, 100):
             if e.get("type") == "m.reaction":
-                relates = e.get("content", {}).get("m.relates_to", {})
-                if relates.get("event_id") == args.event_id:
-                    reactions.append(e)
+                target = e.get("content", {}).get("m.relates_to", {}).get("event_id")
+                if target in missing:
+                    found[target].append(e)
+    return found
+
+
+def cmd_reactions(args):
+    """Query reactions on one or more events."""
+    room_id = resolve_room(args.room)
+    event_ids = list(dict.fromkeys(args.event_ids))
+    found = _fetch_reactions(room_id, event_ids)
 
     if args.json:
-        print(json.dumps(reactions, indent=2))
-    else:
+        # A single event keeps the original flat-list output
+        if len(event_ids) == 1:
+            _print_json(found[event_ids[0]])
+        else:
+            _print_json(found)
+        return
+
+    for event_id in event_ids:
+        reactions = found[event_id]
         if not reactions:
-            print(f"No reactions found on {args.event_id[:30]}")
+            print(f"No reactions found on {event_id[:30]}")
         else:
-            print(f"Reactions on {args.event_id[:30]}:")
+            print(f"Reactions on {event_id[:30]}:")
             for r in reactions:
                 sender = _short_sender(r.get("sender", ""))
                 key = r.get("content", {}).get("m.relates_to", {}).get("key", "?")
@@ -621,6 +987,7 @@ def cmd_reactions(args):
 def cmd_batch(args):
     """Send multiple files with pacing to avoid rate limits."""
     room_id = resolve_room(args.room)
+    encoded_room = _quote_id(room_id)
     delay = args.delay
     files = args.files
 
@@ -629,47 +996,70 @@ def cmd_batch(args):
 
     print(f"Sending batch: {total} files with {delay}s pacing", file=sys.stderr)
 
-    for i, filepath in enumerate(files):
-        if not os.path.isfile(filepath):
-            print(f"  Skipping missing file: {filepath}", file=sys.stderr)
-            continue
-
-        filename = os.path.basename(filepath)
-        mimetype = _guess_mimetype(filepath)
-        msgtype = _detect_msgtype(mimetype)
-        filesize = os.path.getsize(filepath)
-
-        print(f"  [{i + 1}/{total}] {filename}", file=sys.stderr)
-
-        mxc_uri = upload_media(filepath)
-        encoded_room = urllib.parse.quote(room_id, safe="")
-        payload = {
-            "msgtype": msgtype,
-            "body": filename,
-            "url": mxc_uri,
-            "info": {
-                "mimetype": mimetype,
-                "size": filesize,
-            },
-        }
-        api_call(
-            "POST",
-            f"/_matrix/client/v3/rooms/{encoded_room}/send/m.room.message",
-            data=payload,
-        )
-        sent += 1
+    # At most BATCH_UPLOADS uploads run ahead of the sends; the sends
+    # themselves stay serial, paced, and in input order.
+    pool = ThreadPoolExecutor(max_workers=BATCH_UPLOADS)
+    remaining = enumerate(files)
+    queued = deque()
 
-        # Pace between sends (skip delay after last item)
-        if i < total - 1:
-            print(f"  Waiting {delay}s...", file=sys.stderr)
-            time.sleep(delay)
+    def queue_next():
+        for i, filepath in remaining:
+            if not os.path.isfile(filepath):
+                print(f"  Skipping missing file: {filepath}", file=sys.stderr)
+                continue
+            mimetype = _guess_mimetype(filepath)
+            upload = pool.submit(upload_media, filepath, mimetype)
+            queued.append((i, filepath, mimetype, upload))
+            return
+
+    try:
+        for _ in range(BATCH_UPLOADS):
+            queue_next()
+
+        while queued:
+            i, filepath, mimetype, upload = queued.popleft()
+            filename = os.path.basename(filepath)
+            payload = {
+                "msgtype": _detect_msgtype(mimetype),
+                "body": filename,
+                "url": upload.result(),
+                "info": {
+                    "mimetype": mimetype,
+                    "size": os.path.getsize(filepath),
+                },
+            }
+            api_call(
+                "POST",
+                f"/_matrix/client/v3/rooms/{encoded_room}/send/m.room.message",
+                data=payload,
+            )
+            sent += 1
+            # Refill the window now so the next upload overlaps the pacing delay
+            queue_next()
+
+            # One progress write per file; pace between sends (skip delay after last item)
+            last = i == total - 1
+            status = f"  [{i + 1}/{total}] {filename}\n"
+            if not last:
+                status += f"  Waiting {delay}s...\n"
+            sys.stderr.write(status)
+            sys.stderr.flush()
+            if not last:
+                time.sleep(delay)
+    finally:
+        # Don't start queued uploads if a send failed
+        pool.shutdown(cancel_futures=True)
 
     print(f"Batch complete: {sent}/{total} sent", file=sys.stderr)
 
 
 # ─── CLI ───────────────────────────────────────────────────────────────────
 
-def main():
+def _build_parser():
+    """Build the CLI argument parser."""
+    # Imported here so library use of this module doesn't pay for argparse
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Matrix communication -- send messages, read channels, upload media, manage reactions."
     )
@@ -749,8 +1139,11 @@ def main():
     )
 
     # reactions
-    p_reactions = subparsers.add_parser("reactions", help="Query reactions on an event")
-    p_reactions.add_argument("event_id", help="Event ID to query reactions for")
+    p_reactions = subparsers.add_parser("reactions", help="Query reactions on one or more events")
+    p_reactions.add_argument(
+        "event_ids", nargs="+", metavar="event_id",
+        help="Event ID(s) to query reactions for",
+    )
     p_reactions.add_argument(
         "--room", required=True,
         help="Room alias, name, or ID",
@@ -774,7 +1167,11 @@ def main():
         "files", nargs="+",
         help="File paths to upload and send",
     )
+    return parser
 
+
+def main():
+    parser = _build_parser()
     args = parser.parse_args()
 
     if not args.command:
@@ -0,0 +1,176 @@
+"""Regression tests for matrix.py. Run from this directory: python -m unittest"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import matrix
+
+
+class _Homeserver(BaseHTTPRequestHandler):
+    """Just enough of a homeserver for auto-login; counts /login calls."""
+
+    protocol_version = "HTTP/1.1"
+    logins = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.endswith("/login"):
+            with self.lock:
+                type(self).logins += 1
+            time.sleep(0.05)  # keep the window for a racing second login open
+            self._reply({"access_token": "tok", "expires_in_ms": 600000})
+        else:
+            self._reply({})
+
+    def do_GET(self):
+        self._reply({"joined_rooms": []})
+
+
+class HomeserverTest(unittest.TestCase):
+    def setUp(self):
+        _Homeserver.logins = 0
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Homeserver)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        homeserver = f"http://127.0.0.1:{server.server_port}"
+        patcher = mock.patch.multiple(
+            matrix,
+            HOMESERVER=homeserver,
+            _HS_PARTS=urllib.parse.urlsplit(homeserver),
+            ACCESS_TOKEN="",
+            MATRIX_USER="@bot:example.org",
+            MATRIX_PASSWORD="secret",
+            _token_cache={"token": None, "expires_at": 0.0},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def install_stale_connection(self):
+        """Give this thread a pooled connection whose peer has hung up."""
+        conn = http.client.HTTPConnection(matrix._HS_PARTS.netloc)
+        conn.sock, peer = socket.socketpair()
+        peer.close()
+        matrix._local.conn = conn
+        self.addCleanup(matrix._drop_connection)
+
+    def test_login_reconnects_after_stale_connection(self):
+        self.install_stale_connection()
+
+        self.assertEqual(matrix._get_token(), "tok")
+        self.assertEqual(_Homeserver.logins, 1)
+
+    def test_api_call_retries_stale_connection_without_sleeping(self):
+        matrix._get_token()
+        self.install_stale_connection()
+
+        with mock.patch.object(matrix.time, "sleep") as sleep:
+            result = matrix.api_call("GET", "/_matrix/client/v3/joined_rooms",
+                                     max_retries=1)
+
+        self.assertEqual(result, {"joined_rooms": []})
+        sleep.assert_not_called()
+
+    def test_pool_workers_share_one_login(self):
+        def call(_):
+            try:
+                return matrix.api_call("GET", "/_matrix/client/v3/joined_rooms")
+            finally:
+                matrix._drop_connection()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(call, range(8)))
+
+        self.assertEqual(results, [{"joined_rooms": []}] * 8)
+        self.assertEqual(_Homeserver.logins, 1)
+
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_rate_recovers_after_transient_429s(self):
+        limiter = matrix._RateLimiter(rate=10.0, min_rate=0.05, increase=0.1)
+        for _ in range(3):
+            limiter.rate_limited(60000)
+        self.assertEqual(limiter.rate, 0.05)
+
+        for _ in range(50):
+            limiter.succeeded()
+        self.assertAlmostEqual(limiter.rate, 5.05)
+
+        for _ in range(100):
+            limiter.succeeded()
+        self.assertEqual(limiter.rate, 10.0)
+
+    def test_429_after_recovery_slows_down_again(self):
+        limiter = matrix._RateLimiter(rate=10.0)
+        limiter.rate_limited(2000)
+        for _ in range(200):
+            limiter.succeeded()
+        limiter.rate_limited(2000)
+        self.assertEqual(limiter.rate, 0.5)
+
+
+
+class BatchTest(unittest.TestCase):
+    def test_uploads_stay_within_window_of_sends(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for n in range(10):
+                path = os.path.join(tmp, f"{n}.png")
+                with open(path, "wb") as f:
+                    f.write(b"\x89PNG")
+                files.append(path)
+
+            lock = threading.Lock()
+            uploads, sends, ahead = [], [], []
+
+            def upload_media(filepath, mimetype=None):
+                with lock:
+                    uploads.append(filepath)
+                    ahead.append(len(uploads) - len(sends))
+                return f"mxc://ex/{os.path.basename(filepath)}"
+
+            def api_call(method, path, data=None, **kwargs):
+                with lock:
+                    sends.append(data["url"])
+                return {"event_id": "$e"}
+
+            args = argparse.Namespace(room="!r:ex", delay=0, files=files)
+            with mock.patch.object(matrix, "resolve_room", return_value="!r:ex"), \
+                    mock.patch.object(matrix, "upload_media", upload_media), \
+                    mock.patch.object(matrix, "api_call", api_call), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                matrix.cmd_batch(args)
+
+        self.assertEqual(sends, [f"mxc://ex/{n}.png" for n in range(10)])
+        self.assertLessEqual(max(ahead), matrix.BATCH_UPLOADS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,9 @@ import json
 import os
 import re
 import sys
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from fnmatch import fnmatch
 from pathlib import Path
@@ -23,6 +26,11 @@ try:
 except ImportError:
     yaml = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Suppress ONNX Runtime warnings before chromadb import
 os.environ.setdefault("ORT_LOG_LEVEL", "ERROR")
 
@@ -43,6 +51,7 @@ CHROMADB_PATH = os.environ.get("CHROMADB_PATH", "")
 DEFAULT_COLLECTION = "vault"
 DEFAULT_CHUNK_SIZE = 1500
 DEFAULT_CHUNK_OVERLAP = 150
+DEFAULT_BATCH_SIZE = 200
 MIN_SECTION_LENGTH = 50
 
 # Directories to always skip
@@ -50,6 +59,10 @@ SKIP_DIRS = {".obsidian", ".trash", ".git", "__pycache__", "node_modules"}
 
 STATE_FILE = ".obsidian-import-state.json"
 
+# Parallel parsing: worker processes, and files in flight per worker
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_IN_FLIGHT = 4
+
 
 # ── ChromaDB Client ─────────────────────────────────────────
 
@@ -88,21 +101,27 @@ def make_chunk_id(filepath_rel: str, heading_path: str, chunk_index: int = 0,
 
 # ── Frontmatter Parsing ─────────────────────────────────────
 
+_FM_OPEN = re.compile(r"\A---\s*\n")
+_FM_END = re.compile(r"\n---\s*\n")
+
+
 def parse_frontmatter(content: str) -> tuple[dict[str, Any], str]:
     """
     Extract YAML frontmatter from markdown content.
     Returns (frontmatter_dict, remaining_content).
     """
-    if not content.startswith("---"):
+    open_match = _FM_OPEN.match(content)
+    if not open_match:
         return {}, content
 
-    # Find closing ---
-    end_match = re.search(r"\n---\s*\n", content[3:])
+    # Find closing ---, starting at the opening line's newline so an empty
+    # block ("---\n---\n") still closes
+    end_match = _FM_END.search(content, open_match.end() - 1)
     if not end_match:
         return {}, content
 
-    yaml_block = content[3:end_match.start() + 3]
-    remaining = content[end_match.end() + 3:]
+    yaml_block = content[open_match.end():end_match.start()]
+    remaining = content[end_match.end():]
 
     if yaml is None:
         # Fallback: basic key: value parsing without PyYAML
@@ -127,6 +146,9 @@ def parse_frontmatter(content: str) -> tuple[dict[str, Any], str]:
                     fm[key] = value.strip("\"'")
         return fm, remaining
 
+    if not yaml_block.strip():
+        return {}, content
+
     try:
         fm = yaml.safe_load(yaml_block)
         if not isinstance(fm, dict):
@@ -168,16 +190,20 @@ LINK_PATTERN = re.compile(
 CODE_FENCE = re.compile(r"^```", re.MULTILINE)
 
 
-def extract_inline_tags(text: str) -> list[str]:
-    """Extract #tags from markdown body text (not inside code blocks)."""
-    # Remove code blocks before scanning for tags
-    cleaned = CODE_FENCE.sub("", text)
-    tags = TAG_PATTERN.findall(cleaned)
+def extract_inline_tags(text: str, in_fence: bool = False) -> list[str]:
+    """
+    Extract #tags from markdown body text (not inside code blocks).
+    `in_fence` says the text starts inside an open code block.
+    """
+    # A tag is inside a code block when an odd number of fences precede it
+    fences = [m.start() for m in CODE_FENCE.finditer(text)]
     # Deduplicate, preserving order
     seen = set()
     result = []
-    for t in tags:
-        t_lower = t.lower()
+    for m in TAG_PATTERN.finditer(text):
+        if (bisect_right(fences, m.start(1)) + in_fence) % 2:
+            continue
+        t_lower = m.group(1).lower()
         if t_lower not in seen:
             seen.add(t_lower)
             result.append(t_lower)
@@ -200,17 +226,22 @@ def extract_links(text: str) -> list[str]:
 # ── Section Splitting ────────────────────────────────────────
 
 HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+)$", re.MULTILINE)
+_TABLE_ROW = re.compile(r"^\|.*\|.*\|", re.MULTILINE)
+_SENT_SPLIT = re.compile(r"(?<=[.!?])\s+")
 
 
 class Section:
     """A heading-delimited section of a markdown file."""
 
     def __init__(self, heading: str, level: int, content: str,
-                 heading_path: str):
+                 heading_path: str, in_fence: bool = False):
         self.heading = heading
         self.level = level
         self.content = content
         self.heading_path = heading_path  # "H1 > H2 > H3"
+        # Content starts inside a code block, i.e. the heading was a "# ..."
+        # line in fenced code
+        self.in_fence = in_fence
 
     @property
     def text(self) -> str:
@@ -222,7 +253,7 @@ class Section:
 
     @property
     def has_table(self) -> bool:
-        return bool(re.search(r"^\|.*\|.*\|", self.content, re.MULTILINE))
+        return bool(_TABLE_ROW.search(self.content))
 
     @property
     def has_code(self) -> bool:
@@ -242,6 +273,7 @@ def split_into_sections(content: str) -> list[Section]:
 
     # Find all headings with their positions
     headings = list(HEADING_PATTERN.finditer(content))
+    fences = [m.start() for m in CODE_FENCE.finditer(content)]
 
     if not headings:
         # No headings — entire content is one section
@@ -273,7 +305,9 @@ def split_into_sections(content: str) -> list[Section]:
         # Build heading path
         heading_path = " > ".join(h for _, h in heading_stack)
 
-        sections.append(Section(heading, level, section_content, heading_path))
+        in_fence = bisect_right(fences, content_start) % 2 == 1
+        sections.append(Section(heading, level, section_content, heading_path,
+                                in_fence))
 
     return sections
 
@@ -324,7 +358,7 @@ def chunk_text(text: str, max_size: int = DEFAULT_CHUNK_SIZE,
                     current = para
             else:
                 # Single paragraph exceeds max — split by sentences
-                sentences = re.split(r"(?<=[.!?])\s+", para)
+                sentences = _SENT_SPLIT.split(para)
                 for sent in sentences:
                     candidate = (current + " " + sent).strip() if current else sent
                     if len(candidate) <= max_size:
@@ -347,31 +381,38 @@ def sections_to_chunks(
     file_tags: list[str],
     max_chunk_size: int = DEFAULT_CHUNK_SIZE,
     chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    imported_at: Optional[str] = None,
 ) -> list[Chunk]:
     """
     Convert parsed sections into chunks with metadata, ready for ChromaDB.
-    Merges short sections into subsequent sections.
+    Merges short sections into subsequent sections. `imported_at` defaults
+    to the current time.
     """
-    now = datetime.now(timezone.utc).isoformat()
+    now = imported_at or datetime.now(timezone.utc).isoformat()
     fm_metadata = flatten_frontmatter(frontmatter)
     chunks = []
 
     # Merge short sections into the next one
     merged_sections: list[Section] = []
     pending_text = ""
+    pending_in_fence = False
 
     for section in sections:
         full_text = section.text.strip()
         if len(full_text) < MIN_SECTION_LENGTH and not section.has_table:
             # Too short to stand alone — prepend to next section
+            if not pending_text:
+                pending_in_fence = section.in_fence
             pending_text += full_text + "\n\n"
         else:
+            in_fence = section.in_fence
             if pending_text:
                 full_text = pending_text + full_text
+                in_fence = pending_in_fence
                 pending_text = ""
             merged_sections.append(
                 Section(section.heading, section.level, full_text,
-                        section.heading_path)
+                        section.heading_path, in_fence)
             )
 
     # Flush any remaining pending text
@@ -381,10 +422,12 @@ def sections_to_chunks(
             merged_sections[-1] = Section(
                 last.heading, last.level,
                 last.content + "\n\n" + pending_text.strip(),
-                last.heading_path,
+                last.heading_path, last.in_fence,
             )
         else:
-            merged_sections.append(Section("", 0, pending_text.strip(), ""))
+            merged_sections.append(
+                Section("", 0, pending_text.strip(), "", pending_in_fence)
+            )
 
     for section in merged_sections:
         section_text = section.text.strip()
@@ -392,7 +435,7 @@ def sections_to_chunks(
             continue
 
         # Extract links and tags from this section
-        section_tags = extract_inline_tags(section.content)
+        section_tags = extract_inline_tags(section.content, section.in_fence)
         section_links = extract_links(section.content)
         all_tags = sorted(set(file_tags + section_tags))
 
@@ -430,15 +473,41 @@ def sections_to_chunks(
 
 # ── File Discovery ───────────────────────────────────────────
 
+def _walk_md(root: str):
+    """
+    Yield .md file paths under root as strings, in the same order as
+    sorted(Path(root).rglob("*.md")). Hidden and SKIP_DIRS entries are
+    pruned without descending into them; like rglob, symlinked directories
+    are not followed.
+    """
+    try:
+        with os.scandir(root) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith(".") or entry.name in SKIP_DIRS:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_md(entry.path)
+        elif entry.name.endswith(".md"):
+            yield entry.path
+
+
 def discover_files(
     vault_path: Path,
     folder: Optional[str] = None,
     tag: Optional[str] = None,
     glob_pattern: Optional[str] = None,
+    preparsed: Optional[dict[Path, tuple[dict[str, Any], str]]] = None,
 ) -> list[Path]:
     """
     Find all .md files in the vault, applying filters.
     Returns absolute paths sorted alphabetically.
+
+    The tag filter has to read and parse each file; if a `preparsed` dict is
+    given, the (frontmatter, body) of every matching file is stored in it so
+    parse_file does not read the file again.
     """
     files = []
 
@@ -450,19 +519,18 @@ def discover_files(
             print(f"Warning: folder not found: {search_root}", file=sys.stderr)
             return []
 
-    for md_file in sorted(search_root.rglob("*.md")):
         # Skip excluded directories
-        parts = md_file.relative_to(vault_path).parts
+        parts = search_root.relative_to(vault_path).parts
         if any(part.startswith(".") or part in SKIP_DIRS for part in parts):
-            continue
+            return []
 
+    prefix_len = len(os.path.join(vault_path, ""))
+    for md_file in _walk_md(str(search_root)):
         # Apply glob filter
-        if glob_pattern:
-            rel = str(md_file.relative_to(vault_path))
-            if not fnmatch(rel, glob_pattern):
-                continue
+        if glob_pattern and not fnmatch(md_file[prefix_len:], glob_pattern):
+            continue
 
-        files.append(md_file)
+        files.append(Path(md_file))
 
     # Apply tag filter (requires reading files)
     if tag:
@@ -487,6 +555,8 @@ def discover_files(
             all_tags = [t.lower().lstrip("#") for t in fm_tags + inline_tags]
             if tag_lower in all_tags:
                 filtered.append(f)
+                if preparsed is not None:
+                    preparsed[f] = (fm, body)
 
         files = filtered
 
@@ -495,33 +565,48 @@ def discover_files(
 
 # ── Incremental State ────────────────────────────────────────
 
-def load_state(vault_path: Path) -> dict[str, float]:
-    """Load import state (file mtimes) from state file."""
+def load_state(vault_path: Path) -> dict[str, Any]:
+    """
+    Load import state from state file.
+    Values are [mtime, size]; older state files hold a bare mtime.
+    """
     state_path = vault_path / STATE_FILE
     if state_path.exists():
         try:
-            return json.loads(state_path.read_text(encoding="utf-8"))
+            data = state_path.read_bytes()
+            return orjson.loads(data) if orjson else json.loads(data)
         except (json.JSONDecodeError, OSError):
             pass
     return {}
 
 
-def save_state(vault_path: Path, state: dict[str, float]):
+def save_state(vault_path: Path, state: dict[str, Any]):
     """Save import state to state file."""
     state_path = vault_path / STATE_FILE
-    state_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    if orjson:
+        state_path.write_bytes(orjson.dumps(state, option=orjson.OPT_INDENT_2))
+    else:
+        state_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
 
 
 # ── Parse a Single File ─────────────────────────────────────
 
 def parse_file(filepath: Path, vault_path: Path, max_chunk_size: int,
-               chunk_overlap: int) -> list[Chunk]:
-    """Parse a markdown file into chunks."""
-    content = filepath.read_text(encoding="utf-8", errors="replace")
+               chunk_overlap: int,
+               preparsed: Optional[tuple[dict[str, Any], str]] = None,
+               imported_at: Optional[str] = None) -> list[Chunk]:
+    """
+    Parse a markdown file into chunks.
+    `preparsed` is the (frontmatter, body) already read by discover_files.
+    """
     filepath_rel = str(filepath.relative_to(vault_path))
 
     # Parse frontmatter
-    frontmatter, body = parse_frontmatter(content)
+    if preparsed is not None:
+        frontmatter, body = preparsed
+    else:
+        content = filepath.read_text(encoding="utf-8", errors="replace")
+        frontmatter, body = parse_frontmatter(content)
 
     # Collect file-level tags
     fm_tags = frontmatter.get("tags", [])
@@ -538,10 +623,45 @@ def parse_file(filepath: Path, vault_path: Path, max_chunk_size: int,
     # Convert to chunks
     return sections_to_chunks(
         sections, filepath_rel, frontmatter, fm_tags,
-        max_chunk_size, chunk_overlap,
+        max_chunk_size, chunk_overlap, imported_at,
     )
 
 
+def parse_files(files: list[Path], vault_path: Path, max_chunk_size: int,
+                chunk_overlap: int,
+                preparsed: Optional[dict[Path, tuple[dict[str, Any], str]]] = None,
+                imported_at: Optional[str] = None):
+    """
+    Parse files in parallel worker processes.
+
+    Yields (filepath, future) in input order; future.result() returns the
+    chunks or re-raises the parse error. Only PARSE_IN_FLIGHT files per worker
+    are queued at a time, so memory stays bounded on large vaults. Entries in
+    `preparsed` (from discover_files) are handed to the worker and dropped.
+    """
+    preparsed = preparsed if preparsed is not None else {}
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        remaining = iter(files)
+        in_flight = deque()
+
+        def submit(f):
+            in_flight.append((f, pool.submit(
+                parse_file, f, vault_path, max_chunk_size, chunk_overlap,
+                preparsed.pop(f, None), imported_at,
+            )))
+
+        for f in remaining:
+            submit(f)
+            if len(in_flight) >= PARSE_WORKERS * PARSE_IN_FLIGHT:
+                break
+        while in_flight:
+            f, future = in_flight.popleft()
+            nxt = next(remaining, None)
+            if nxt is not None:
+                submit(nxt)
+            yield f, future
+
+
 # ── Commands ─────────────────────────────────────────────────
 
 def cmd_scan(args):
@@ -551,7 +671,8 @@ def cmd_scan(args):
         print(f"Error: vault not found at {vault_path}", file=sys.stderr)
         sys.exit(1)
 
-    files = discover_files(vault_path, args.folder, args.tag, args.glob)
+    preparsed = {}
+    files = discover_files(vault_path, args.folder, args.tag, args.glob, preparsed)
     if not files:
         print("No .md files found matching filters.")
         return
@@ -564,8 +685,9 @@ def cmd_scan(args):
     print(f"Files found: {len(files)}")
     print()
 
-    for f in files:
-        chunks = parse_file(f, vault_path, args.chunk_size, args.chunk_overlap)
+    for f, parsed in parse_files(files, vault_path, args.chunk_size,
+                                 args.chunk_overlap, preparsed):
+        chunks = parsed.result()
         rel = f.relative_to(vault_path)
         sections = len(set(c.metadata["heading_path"] for c in chunks))
 
@@ -587,20 +709,28 @@ def cmd_import(args):
         print(f"Error: vault not found at {vault_path}", file=sys.stderr)
         sys.exit(1)
 
-    files = discover_files(vault_path, args.folder, args.tag, args.glob)
+    preparsed = {}
+    files = discover_files(vault_path, args.folder, args.tag, args.glob, preparsed)
     if not files:
         print("No .md files found matching filters.")
         return
 
-    # Incremental: filter to changed files
+    # Incremental: filter to changed files, by mtime and size
     state = {}
+    file_stats: dict[Path, os.stat_result] = {}
     if args.incremental:
         state = load_state(vault_path)
         changed = []
         for f in files:
             rel = str(f.relative_to(vault_path))
-            mtime = f.stat().st_mtime
-            if rel not in state or state[rel] != mtime:
+            st = file_stats[f] = f.stat()
+            current = [st.st_mtime, st.st_size]
+            prev = state.get(rel)
+            if isinstance(prev, (int, float)):
+                prev = [prev, st.st_size]  # mtime-only entry from an older version
+            if prev == current:
+                state[rel] = current
+            else:
                 changed.append(f)
         skipped = len(files) - len(changed)
         if skipped > 0:
@@ -627,34 +757,59 @@ def cmd_import(args):
 
     stats = {"files": 0, "chunks": 0, "errors": 0}
     new_state = dict(state)  # Copy existing state for incremental
+    # One timestamp for the whole run, shared by every chunk
+    imported_at = datetime.now(timezone.utc).isoformat()
 
-    for f in files:
-        rel = str(f.relative_to(vault_path))
-        try:
-            chunks = parse_file(f, vault_path, args.chunk_size, args.chunk_overlap)
-
-            if not chunks:
-                print(f"  {rel}: (empty, skipped)")
-                continue
+    # Chunks are buffered across files and upserted in --batch-size batches;
+    # a file only counts as imported once all of its chunks are written.
+    batch_size = args.batch_size
+    pending: list[Chunk] = []
+    pending_files: list[tuple[Path, str, int]] = []
 
-            # Batch upsert (ChromaDB supports batches)
-            batch_size = 100
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
+    def flush():
+        try:
+            for i in range(0, len(pending), batch_size):
+                batch = pending[i:i + batch_size]
                 collection.upsert(
                     ids=[c.chunk_id for c in batch],
                     documents=[c.text for c in batch],
                     metadatas=[c.metadata for c in batch],
                 )
-
-            stats["files"] += 1
-            stats["chunks"] += len(chunks)
-            new_state[rel] = f.stat().st_mtime
-            print(f"  + {rel}: {len(chunks)} chunks")
-
+        except Exception as e:
+            stats["errors"] += len(pending_files)
+            for _, rel, _ in pending_files:
+                print(f"  ! {rel}: {e}", file=sys.stderr)
+        else:
+            for f, rel, count in pending_files:
+                stats["files"] += 1
+                stats["chunks"] += count
+                print(f"  + {rel}: {count} chunks")
+                if args.incremental:
+                    st = file_stats[f]
+                    new_state[rel] = [st.st_mtime, st.st_size]
+        pending.clear()
+        pending_files.clear()
+
+    for f, parsed in parse_files(files, vault_path, args.chunk_size,
+                                 args.chunk_overlap, preparsed, imported_at):
+        rel = str(f.relative_to(vault_path))
+        try:
+            chunks = parsed.result()
         except Exception as e:
             stats["errors"] += 1
             print(f"  ! {rel}: {e}", file=sys.stderr)
+            continue
+
+        if not chunks:
+            print(f"  {rel}: (empty, skipped)")
+            continue
+
+        pending.extend(chunks)
+        pending_files.append((f, rel, len(chunks)))
+        if len(pending) >= batch_size:
+            flush()
+
+    flush()
 
     # Save state for incremental
     if args.incremental:
@@ -725,6 +880,14 @@ def cmd_stats(args):
 
 # ── CLI ──────────────────────────────────────────────────────
 
+def positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Import an Obsidian vault into ChromaDB for semantic search",
@@ -779,6 +942,8 @@ Examples:
                           help=f"Max chunk size in characters (default: {DEFAULT_CHUNK_SIZE})")
     p_import.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP,
                           help=f"Chunk overlap in characters (default: {DEFAULT_CHUNK_OVERLAP})")
+    p_import.add_argument("--batch-size", type=positive_int, default=DEFAULT_BATCH_SIZE,
+                          help=f"Chunks per ChromaDB upsert (default: {DEFAULT_BATCH_SIZE})")
     p_import.set_defaults(func=cmd_import)
 
     # ── clear ──
@@ -0,0 +1,131 @@
+"""Regression tests for obsidian_import.py. Run from this directory: python -m unittest"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+try:
+    import obsidian_import
+except SystemExit:  # chromadb not installed; the module exits on import
+    obsidian_import = None
+
+
+@unittest.skipIf(obsidian_import is None, "chromadb not installed")
+class DiscoverFilesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.vault = Path(tmp.name).resolve()
+
+    def write(self, rel: str, text: str = "# note\n"):
+        path = self.vault / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    def rels(self, *args) -> list[str]:
+        files = obsidian_import.discover_files(self.vault, *args)
+        return [str(f.relative_to(self.vault)) for f in files]
+
+    def test_order_and_pruning_match_rglob(self):
+        for rel in ("b.md", "a-c.md", "a/b.md", "A.md", "sub.md", "sub/deep/q.md",
+                    ".hidden/h.md", ".x.md", "node_modules/n.md", ".obsidian/o.md"):
+            self.write(rel)
+
+        self.assertEqual(self.rels(), ["A.md", "a/b.md", "a-c.md", "b.md",
+                                       "sub/deep/q.md", "sub.md"])
+        self.assertEqual(self.rels(None, None, "a*"), ["a/b.md", "a-c.md"])
+
+    def test_symlinked_directories_are_not_followed(self):
+        self.write("real/a.md")
+        self.write("outside/e.md")
+        os.symlink("..", self.vault / "real" / "loop")
+        os.symlink("real", self.vault / "alias")
+        os.symlink("outside/e.md", self.vault / "linked.md")
+
+        self.assertEqual(self.rels(), ["linked.md", "outside/e.md", "real/a.md"])
+
+
+
+@unittest.skipIf(obsidian_import is None, "chromadb not installed")
+class InlineTagsTest(unittest.TestCase):
+    NOTE = (
+        "# Setup #real\n\n"
+        "Some text long enough to stand alone as its own section here.\n\n"
+        "```python\n"
+        "# configure\n"
+        "x = 1  #codetag\n"
+        "```\n\n"
+        "After the block #after, with more text to keep the section long.\n"
+    )
+
+    def test_tags_inside_code_blocks_are_skipped(self):
+        self.assertEqual(obsidian_import.extract_inline_tags(self.NOTE),
+                         ["real", "after"])
+
+    def test_headings_inside_code_keep_section_ids(self):
+        sections = obsidian_import.split_into_sections(self.NOTE)
+        chunks = obsidian_import.sections_to_chunks(sections, "note.md", {}, [])
+
+        # "# configure" still splits the section, so chunk IDs are stable
+        self.assertEqual([c.chunk_id for c in chunks],
+                         ["note::setup-real", "note::configure"])
+        self.assertEqual([c.metadata.get("tags") for c in chunks],
+                         ["real", "after"])
+
+
+
+@unittest.skipIf(obsidian_import is None, "chromadb not installed")
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.vault = Path(tmp.name).resolve()
+        for name in ("a.md", "b.md"):
+            (self.vault / name).write_text(
+                "# Note\n\nEnough body text to make a chunk of its own here.\n",
+                encoding="utf-8")
+        self.collection = mock.Mock()
+        client = mock.Mock()
+        client.get_or_create_collection.return_value = self.collection
+        patcher = mock.patch.object(obsidian_import, "get_chromadb_client",
+                                    return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_import(self, *extra):
+        argv = ["obsidian_import.py", "import", "--vault", str(self.vault), *extra]
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch("sys.argv", argv), contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            obsidian_import.main()
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_batch_size_must_be_positive(self):
+        with self.assertRaises(SystemExit):
+            self.run_import("--batch-size", "0")
+        self.collection.upsert.assert_not_called()
+
+    def test_failed_batch_is_not_reported_or_saved(self):
+        self.collection.upsert.side_effect = RuntimeError("server down")
+
+        stdout, stderr = self.run_import("--incremental")
+
+        self.assertNotIn("+ a.md", stdout)
+        self.assertIn("! a.md: server down", stderr)
+        self.assertIn("! b.md: server down", stderr)
+        self.assertEqual(obsidian_import.load_state(self.vault), {})
+
+    def test_successful_batch_is_reported_and_saved(self):
+        stdout, _ = self.run_import("--incremental", "--batch-size", "1")
+
+        self.assertIn("+ a.md: 1 chunks", stdout)
+        self.assertIn("+ b.md: 1 chunks", stdout)
+        self.assertEqual(sorted(obsidian_import.load_state(self.vault)), ["a.md", "b.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()